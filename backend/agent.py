@@ -1,30 +1,18 @@
-from agents import Agent, ModelSettings, OpenAIChatCompletionsModel, RunConfig, Runner, AsyncOpenAI, GuardrailFunctionOutput, RunContextWrapper, TResponseInputItem, input_guardrail, output_guardrail
+from agents import Agent, ModelSettings, Runner, GuardrailFunctionOutput, RunContextWrapper, TResponseInputItem, input_guardrail, output_guardrail
+from llm import external_client, model, config
 from story_agent import story_agent
+from citation_verifier import INVALID, VALID, verify_citations
+from model_profiles import apply_profiles, run_verdict
+from quran_structure import load_structure_index
+from federated_search import search_sources
+from fallback_replies import OFF_TOPIC, OUTPUT_DRIFT, QURAN_SCOPE, fallback_reply, local_reply, mentions_off_topic
+from run_context import query_from, record_verdict, reused_verdict
 import pandas as pd
-from dotenv import load_dotenv
 from pydantic import BaseModel
 import asyncio
-import os
+import logging
 
-load_dotenv()
-
-FIREWORKS_API_KEY = os.getenv("FIREWORKS_API_KEY")
-
-external_client = AsyncOpenAI(
-    api_key=FIREWORKS_API_KEY,
-    base_url="https://api.fireworks.ai/inference/v1"
-)
-
-model = OpenAIChatCompletionsModel(
-    model="accounts/fireworks/models/gpt-oss-20b", 
-    openai_client=external_client
-)
-
-config = RunConfig(
-    model=model,
-    model_provider=external_client,
-    tracing_disabled=True
-)
+logger = logging.getLogger(__name__)
 
 # Quran dataset
 df = pd.read_csv("QuranDataset.csv", encoding="utf-8-sig")
@@ -71,15 +59,26 @@ fallback_agent = Agent(
 async def quran_input_guardrail( 
     ctx: RunContextWrapper[None], agent: Agent, input: str | list[TResponseInputItem]
 ) -> GuardrailFunctionOutput:
-    print("Running Quran input guardrail...")
     """Checks if the input question is Quranic-related"""
-    result = await Runner.run(guardrail_agent, input, context=ctx.context)
-    output = str(result.final_output).strip().lower()
+    logger.debug("running Quran input guardrail")
+    if reused_verdict(ctx, "quran_input_guardrail", input):
+        return GuardrailFunctionOutput(output_info="Input already verified in this run.", tripwire_triggered=False)
+    query = query_from(ctx) or (input if isinstance(input, str) else "")
+    # Greetings and plainly off-topic requests are answered without a model call
+    local = local_reply(query, QURAN_SCOPE)
+    if local is not None:
+        return GuardrailFunctionOutput(output_info=local, tripwire_triggered=True)
+    # Fails open: the output guardrail still checks whatever the agent answers
+    output = await run_verdict(guardrail_agent, input, "related", context=ctx.context)
+    record_verdict(ctx, "quran_input_guardrail", input, passed="unrelated" not in output)
 
     if "unrelated" in output:
-        fallback = await Runner.run(fallback_agent, "This question seems unrelated to Quranic context.", context=ctx.context)
+        fallback = await fallback_reply(
+            OFF_TOPIC, query, QURAN_SCOPE, fallback_agent,
+            "This question seems unrelated to Quranic context.", context=ctx.context
+        )
         return GuardrailFunctionOutput(
-            output_info=fallback.final_output, 
+            output_info=fallback,
             tripwire_triggered=True,
         )
     return GuardrailFunctionOutput(
@@ -105,16 +104,31 @@ async def quran_output_guardrail(
     agent: Agent,
     output: str
 ) -> GuardrailFunctionOutput:
-    print("Running Quran output guardrail...")
     """Checks if the generated output is Quranic and valid"""
-    result = await Runner.run(output_guard_agent, output, context=ctx.context)
-    output = str(result.final_output).strip().lower()
-
-    if "invalid" in output:
+    logger.debug("running Quran output guardrail")
+    if reused_verdict(ctx, "quran_output_guardrail", output):
+        return GuardrailFunctionOutput(output_info="Response already validated in this run.", tripwire_triggered=False)
+    # Verse references and Arabic quotes are checked locally first. Verified
+    # citations only settle topicality when nothing off-topic shows up in the
+    # reply; otherwise the LLM verifier judges it.
+    check = verify_citations(output)
+    if check.status == INVALID:
+        verdict = INVALID  # a verse that doesn't exist, or Arabic that isn't the cited verse
+    elif check.status == VALID and not mentions_off_topic(output):
+        verdict = VALID
+    else:
+        # Fails closed: an unverified reply is replaced by the fallback
+        verdict = await run_verdict(output_guard_agent, output, "invalid", context=ctx.context)
+    record_verdict(ctx, "quran_output_guardrail", output, passed="invalid" not in verdict)
+
+    if "invalid" in verdict:
         # If the model says the response drifted — send fallback
-        fallback = await Runner.run(fallback_agent, "Sorry, I can only provide responses based on Quranic content.", context=ctx.context)
+        fallback = await fallback_reply(
+            OUTPUT_DRIFT, query_from(ctx) or output, QURAN_SCOPE, fallback_agent,
+            "Sorry, I can only provide responses based on Quranic content.", context=ctx.context
+        )
         return GuardrailFunctionOutput(
-            output_info=fallback.final_output,
+            output_info=fallback,
             tripwire_triggered=True,
         )
 
@@ -123,20 +137,34 @@ async def quran_output_guardrail(
         tripwire_triggered=False
     )
 
+apply_profiles(guardrail_agent, fallback_agent, output_guard_agent)
 
-agent = Agent(
-    name="QuranTadabburAgent",
-    instructions=f'You are Tadabbur a knowledgeable assistant specializing in Quranic knowledge on {context} data. Provide short detail on the Quranic verses provided in {context} data with its arabic too.'
+
+tadabbur_prompt = (
+    f'You are Tadabbur a knowledgeable assistant specializing in Quranic knowledge on {context} data. Provide short detail on the Quranic verses provided in {context} data with its arabic too.'
     "Tell in proper structure by starting each ayah from a new line"
     "If a user asks for Quranic **stories**, narratives of prophets, or moral lessons, "
     "you must **handoff** the conversation to the `QuranStoryTeller` agent by calling "
     "`transfer_to_quranstoryteller`. "
-    "talk in english on default unless user asks in other language.",
+    "Use the `search_sources` tool to find related ayahs, tafsir, reasons of revelation (Asbab al-Nuzul) or duas. "
+    "talk in english on default unless user asks in other language."
+)
+
+def tadabbur_instructions(ctx: RunContextWrapper, agent: Agent) -> str:
+    """Adds exact juz / hizb / ruku / manzil / sajdah ranges when the request names one."""
+    notes = load_structure_index().notes(query_from(ctx))
+    return f"{tadabbur_prompt}\n\n{notes}" if notes else tadabbur_prompt
+
+
+agent = Agent(
+    name="QuranTadabburAgent",
+    instructions=tadabbur_instructions,
     model_settings=ModelSettings(
         temperature=0.2,
     ),
     input_guardrails=[quran_input_guardrail],
     output_guardrails=[quran_output_guardrail],
+    tools=[search_sources],
     handoffs=[{"QuranStoryTeller": story_agent}]
 )
 
@@ -12,6 +12,7 @@ import os
 from dotenv import load_dotenv
 import asyncio
 import pandas as pd
+from federated_search import search_sources
 
 # Load .env
 load_dotenv()
@@ -74,7 +75,10 @@ ApplicationAgent = Agent(
         When providing a match:
         - Share Arabic text, English translation, short practical steps, and source.
         - Keep responses concise, spiritually meaningful, and teacher-like.
-    """
+
+        Use the `search_sources` tool to find duas beyond this list or the ayahs behind them.
+    """,
+    tools=[search_sources],
 )
 
    
@@ -0,0 +1,268 @@
+"""Cleans the OCR'd Asbab al-Nuzul pages into passages for prompts and retrieval.
+
+Pages stream through generator stages (read -> strip headers/footers ->
+unwrap lines -> join across pages -> split into passages), and the result is
+written to a gzip JSON-lines artifact named after the source file's hash.
+Restarts and unchanged redeploys just read that artifact back; when the CSV
+changes, only the pages whose text changed are cleaned again.
+
+    python asbab_pipeline.py            # build (or reuse) the artifact and print stats
+"""
+import contextlib
+import csv
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+ASBAB_CSV_PATH = "asbabul_nuzul_text.csv"
+CACHE_DIR = os.getenv("ASBAB_CACHE_DIR", ".cache/asbab")
+PIPELINE_VERSION = 1  # bump when the cleaning rules change to invalidate old artifacts
+
+# A line is boilerplate when it opens or closes at least this share of pages
+BOILERPLATE_MIN_SHARE = 0.2
+PASSAGE_MAX_CHARS = 1200
+
+_PAGE_NUMBER_RE = re.compile(r"^\s*(\d{1,4}|[ivxlc]{1,7})\s*$", re.IGNORECASE)
+_DIGITS_RE = re.compile(r"\d+")
+_SENTENCE_END_RE = re.compile(r"[.!?…][”’\"')\]]*\s*$")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…][”’\"')\]])\s+|(?<=[.!?…])\s+(?=[A-Z“‘(\[])")
+_VERSE_REF_RE = re.compile(r"\[(\d{1,3}):(\d{1,3})(?:-\d{1,3})?\]")
+
+
+@dataclass
+class Page:
+    number: int
+    text: str
+
+
+@dataclass
+class Passage:
+    id: int
+    first_page: int
+    last_page: int
+    text: str
+    verses: list[str] = field(default_factory=list)  # "surah:ayah" references cited in the passage
+
+
+# ------------------- STAGES -------------------
+
+def read_pages(path: str = ASBAB_CSV_PATH) -> Iterator[Page]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield Page(int(row["page_number"]), (row["text"] or "").replace("­", ""))
+
+
+def _signature(line: str) -> str:
+    return _DIGITS_RE.sub("#", line.strip().lower())
+
+
+def find_boilerplate(pages: Iterable[Page]) -> frozenset[str]:
+    """Signatures of lines that recur at the top or bottom of many pages."""
+    counts: Counter[str] = Counter()
+    total = 0
+    for page in pages:
+        lines = [line for line in page.text.splitlines() if line.strip()]
+        total += 1
+        edges = {_signature(line) for line in lines[:1] + lines[-1:]}
+        counts.update(edges)
+    threshold = max(3, BOILERPLATE_MIN_SHARE * total)
+    # Verse headings like "[2:255]" recur as "[#:#]" but are content, not boilerplate
+    return frozenset(sig for sig, n in counts.items() if n >= threshold and "[#:#]" not in sig)
+
+
+def strip_boilerplate(page: Page, boilerplate: frozenset[str]) -> list[str]:
+    """The page's lines without page numbers and recurring headers/footers."""
+    lines = [line.strip() for line in page.text.splitlines() if line.strip()]
+    while lines and (_PAGE_NUMBER_RE.match(lines[-1]) or _signature(lines[-1]) in boilerplate):
+        lines.pop()
+    while lines and (_PAGE_NUMBER_RE.match(lines[0]) or _signature(lines[0]) in boilerplate):
+        lines.pop(0)
+    return lines
+
+
+def _join(left: str, right: str) -> str:
+    # OCR hyphens at a wrap are compounds here ("al-\nBaqarah", "so-\nand-so"),
+    # so the hyphen stays and only the line break goes
+    if left.endswith("-") and right[:1].isalpha():
+        return left + right
+    return f"{left} {right}"
+
+
+def unwrap(lines: list[str]) -> list[str]:
+    """Rejoins wrapped lines into paragraphs.
+
+    A paragraph ends on a short line that closes a sentence; full-width lines
+    always continue. The last paragraph is left open when the page ends
+    mid-sentence so the next page can continue it.
+    """
+    if not lines:
+        return []
+    width = sorted(len(line) for line in lines)[len(lines) // 2]
+    paragraphs: list[str] = []
+    current = ""
+    for line in lines:
+        current = _join(current, line) if current else line
+        if len(line) < 0.8 * width and _SENTENCE_END_RE.search(line):
+            paragraphs.append(current)
+            current = ""
+    if current:
+        paragraphs.append(current)
+    return paragraphs
+
+
+def clean_page(page: Page, boilerplate: frozenset[str]) -> list[str]:
+    return unwrap(strip_boilerplate(page, boilerplate))
+
+
+def join_pages(pages: Iterable[tuple[int, list[str]]]) -> Iterator[tuple[int, int, str]]:
+    """Merges a paragraph cut by a page break with its continuation.
+
+    Yields (first_page, last_page, paragraph).
+    """
+    pending: tuple[int, int, str] | None = None
+    for number, paragraphs in pages:
+        for i, paragraph in enumerate(paragraphs):
+            first = number
+            if pending is not None:
+                if i == 0 and not _SENTENCE_END_RE.search(pending[2]):
+                    first, paragraph = pending[0], _join(pending[2], paragraph)
+                else:
+                    yield pending
+                pending = None
+            if i == len(paragraphs) - 1:
+                pending = (first, number, paragraph)
+            else:
+                yield first, number, paragraph
+    if pending is not None:
+        yield pending
+
+
+def split_passages(paragraphs: Iterable[tuple[int, int, str]], max_chars: int = PASSAGE_MAX_CHARS) -> Iterator[Passage]:
+    """Packs paragraphs into passages of at most `max_chars`, on sentence boundaries."""
+    passage_id = 0
+    for first, last, paragraph in paragraphs:
+        chunk = ""
+        for sentence in _SENTENCE_SPLIT_RE.split(paragraph):
+            if chunk and len(chunk) + len(sentence) + 1 > max_chars:
+                yield Passage(passage_id, first, last, chunk, _verses(chunk))
+                passage_id += 1
+                chunk = sentence
+            else:
+                chunk = f"{chunk} {sentence}" if chunk else sentence
+        if chunk:
+            yield Passage(passage_id, first, last, chunk, _verses(chunk))
+            passage_id += 1
+
+
+def _verses(text: str) -> list[str]:
+    return list(dict.fromkeys(f"{s}:{a}" for s, a in _VERSE_REF_RE.findall(text)))
+
+
+# ------------------- CACHE -------------------
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256(f"v{PIPELINE_VERSION}".encode())
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:24]
+
+
+def _page_key(page: Page, boilerplate_key: str) -> str:
+    return hashlib.blake2b(f"{boilerplate_key}\0{page.text}".encode(), digest_size=12).hexdigest()
+
+
+_ARTIFACT_RE = re.compile(r"asbab-[0-9a-f]+\.jsonl\.gz")
+
+
+def _artifact_path(source_hash: str) -> str:
+    return os.path.join(CACHE_DIR, f"asbab-{source_hash}.jsonl.gz")
+
+
+def _page_cache_path() -> str:
+    return os.path.join(CACHE_DIR, "pages.json.gz")
+
+
+def _write_atomic(path: str, lines: Iterable[str]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for line in lines:
+            f.write(line + "\n")
+    os.replace(tmp, path)
+
+
+def build(path: str = ASBAB_CSV_PATH, stats: dict | None = None) -> str:
+    """Writes the passages artifact for `path` unless it already exists; returns its path."""
+    stats = stats if stats is not None else {}
+    artifact = _artifact_path(file_hash(path))
+    if os.path.exists(artifact):
+        stats["cached"] = True
+        return artifact
+
+    boilerplate = find_boilerplate(read_pages(path))
+    boilerplate_key = hashlib.blake2b("\n".join(sorted(boilerplate)).encode(), digest_size=8).hexdigest()
+    try:
+        with gzip.open(_page_cache_path(), "rt", encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = {}
+    if previous.get("version") != PIPELINE_VERSION:
+        previous = {}
+    cached_pages: dict[str, list[str]] = previous.get("pages", {})
+
+    page_cache: dict[str, list[str]] = {}
+    stats.update(cached=False, pages=0, pages_cleaned=0, passages=0)
+
+    def cleaned_pages() -> Iterator[tuple[int, list[str]]]:
+        for page in read_pages(path):
+            key = _page_key(page, boilerplate_key)
+            paragraphs = cached_pages.get(key)
+            if paragraphs is None:
+                paragraphs = clean_page(page, boilerplate)
+                stats["pages_cleaned"] += 1
+            page_cache[key] = paragraphs
+            stats["pages"] += 1
+            yield page.number, paragraphs
+
+    def records() -> Iterator[str]:
+        for passage in split_passages(join_pages(cleaned_pages())):
+            stats["passages"] += 1
+            yield json.dumps(asdict(passage), ensure_ascii=False)
+
+    _write_atomic(artifact, records())
+    _write_atomic(_page_cache_path(), [json.dumps({"version": PIPELINE_VERSION, "pages": page_cache}, ensure_ascii=False)])
+    # Older artifacts belong to previous versions of the CSV. Only finished
+    # artifacts are removed: a .tmp is another worker's build in progress.
+    for name in os.listdir(CACHE_DIR):
+        old = os.path.join(CACHE_DIR, name)
+        if _ARTIFACT_RE.fullmatch(name) and old != artifact:
+            with contextlib.suppress(FileNotFoundError):  # another worker got there first
+                os.remove(old)
+    return artifact
+
+
+def iter_passages(path: str = ASBAB_CSV_PATH) -> Iterator[Passage]:
+    """Streams the cleaned passages, building the artifact first if needed."""
+    with gzip.open(build(path), "rt", encoding="utf-8") as f:
+        for line in f:
+            yield Passage(**json.loads(line))
+
+
+@lru_cache(maxsize=1)
+def load_passages(path: str = ASBAB_CSV_PATH) -> tuple[Passage, ...]:
+    return tuple(iter_passages(path))
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else ASBAB_CSV_PATH
+    build_stats: dict = {}
+    print(build(source, build_stats))
+    print(json.dumps(build_stats))
@@ -0,0 +1,97 @@
+"""Exercises the model resilience layer against the fault-injecting stand-in.
+
+Scenarios: slow tail (hedging on vs off), transient errors (budgeted retries)
+and a full outage (circuit breaker fails fast, then recovers).
+
+    cd backend && python -m benchmarks.resilience_check
+"""
+import argparse
+import asyncio
+import time
+
+from agents import Agent, AsyncOpenAI, OpenAIChatCompletionsModel, Runner, set_tracing_disabled
+
+from benchmarks.stand_in_server import StandInServer
+from resilience import ResilienceSettings, ResilientModel, Upstream, UpstreamUnavailable
+
+VERDICT_INSTRUCTIONS = "Respond only with 'RELATED' or 'UNRELATED'."
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def build_agent(base_url: str, settings: ResilienceSettings) -> tuple[Agent, Upstream]:
+    client = AsyncOpenAI(api_key="stand-in", base_url=base_url, max_retries=0, timeout=settings.attempt_timeout_s)
+    upstream = Upstream(settings)
+    model = ResilientModel(OpenAIChatCompletionsModel(model="stand-in", openai_client=client), upstream)
+    return Agent(name="ResilienceProbe", instructions=VERDICT_INSTRUCTIONS, model=model), upstream
+
+
+async def fire(agent: Agent, n: int, concurrency: int) -> tuple[list[float], int]:
+    """Runs `n` calls; returns per-call latencies (ms) and the number of failures."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await Runner.run(agent, "What does 2:255 teach?")
+            except UpstreamUnavailable:
+                failures += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return latencies, failures
+
+
+def report(name: str, latencies: list[float], failures: int, upstream: Upstream) -> None:
+    s = upstream.stats
+    print(
+        f"{name:<28} p50={percentile(latencies, 50):6.0f}ms p99={percentile(latencies, 99):6.0f}ms "
+        f"failed={failures:<3} attempts/call={s['attempts'] / max(1, s['calls']):.2f} "
+        f"retries={s['retries']} hedges={s['hedges']} (won {s['hedge_wins']}) "
+        f"rejected_open={s['rejected_open']}"
+    )
+
+
+async def main(args) -> None:
+    set_tracing_disabled(True)
+    with StandInServer(port=args.port) as server:
+        base = dict(hedge_min_samples=10, attempt_timeout_s=5, deadline_s=8)
+
+        # 1. Slow tail: 5% of calls stall for 2s
+        server.set_faults(slow_rate=0.05, slow_extra_s=2.0)
+        for hedge in (False, True):
+            agent, upstream = build_agent(server.base_url, ResilienceSettings(**base, hedge_enabled=hedge))
+            await fire(agent, 20, 4)  # warm up the latency window
+            upstream.stats.update(dict.fromkeys(upstream.stats, 0))
+            latencies, failures = await fire(agent, args.calls, args.concurrency)
+            report(f"slow tail, hedging {'on' if hedge else 'off'}", latencies, failures, upstream)
+
+        # 2. Transient errors: 30% of requests fail with 503
+        server.set_faults(slow_rate=0.0, error_rate=0.3)
+        agent, upstream = build_agent(server.base_url, ResilienceSettings(**base, retry_ratio=0.5, failure_threshold=50))
+        latencies, failures = await fire(agent, args.calls, args.concurrency)
+        report("30% errors, retry budget", latencies, failures, upstream)
+
+        # 3. Outage: the breaker opens and later calls fail fast; then it recovers
+        server.set_faults(error_rate=0.0, outage=True)
+        agent, upstream = build_agent(server.base_url, ResilienceSettings(**base, failure_threshold=5, reset_timeout_s=1.0))
+        latencies, failures = await fire(agent, args.calls, args.concurrency)
+        report("outage", latencies, failures, upstream)
+        server.set_faults(outage=False)
+        await asyncio.sleep(1.1)
+        latencies, failures = await fire(agent, 10, 1)
+        print(f"{'after recovery':<28} failed={failures} breaker={upstream.breaker.state}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8766)
+    asyncio.run(main(parser.parse_args()))
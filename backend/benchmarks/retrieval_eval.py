@@ -0,0 +1,296 @@
+"""Offline retrieval evaluation: recall@k, MRR and per-query latency.
+
+Golden question -> relevant-id pairs:
+  - story_exmp.txt queries and `reference` ranges -> Quran ayahs / Asbab passages citing them
+  - curated questions for each corpus, worded the way a user would ask and
+    not copied from the text they should find (a query that quotes its
+    answer measures nothing)
+Cases whose relevant ids are not in the corpus at all are reported as
+uncoverable and left out of the metrics.
+
+Any retriever can be evaluated: pass `--retriever module:factory`, where
+`factory(corpus_name)` returns `search(query, k) -> list[str]` (ids as below),
+or None to skip that corpus. Reports are JSON and can gate a change:
+
+    cd backend && python -m benchmarks.retrieval_eval --out baseline.json
+    python -m benchmarks.retrieval_eval --retriever my_index:factory --baseline baseline.json
+
+Ids: quran "surah:ayah", asbab passage id (asbab_pipeline), duas `ID`.
+"""
+import argparse
+import importlib
+import json
+import re
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+
+from asbab_pipeline import ASBAB_CSV_PATH, load_passages
+from quran_index import SURAH_AYAH_COUNTS, ayah_exists, load_quran_index
+from text_index import BM25Index
+
+QURAN, ASBAB, DUAS = "quran", "asbab", "duas"
+CORPORA = (QURAN, ASBAB, DUAS)
+KS = (1, 5, 10, 20)
+STORY_EXAMPLES_PATH = "story_exmp.txt"
+DUAS_CSV_PATH = "daily_duas.csv"
+
+Search = Callable[[str, int], list[str]]
+
+# Hand-checked questions on the part of the Quran the dataset holds (surahs 1-2)
+CURATED_QURAN_CASES = [
+    ("Which verse describes God never dozing off and His seat spanning the universe?", "2:255"),
+    ("Can people be forced to accept Islam?", "2:256"),
+    ("When did fasting become obligatory and who is excused from it?", "2:183-185"),
+    ("Why did the Muslims stop facing Jerusalem when they pray?", "2:142-150"),
+    ("What happened when the Israelites were told to sacrifice a cow and kept asking questions?", "2:67-73"),
+    ("Is charging interest on a loan allowed?", "2:275-279"),
+    ("How should a loan agreement be documented?", "2:282"),
+    ("Does God ask more of a person than they can handle?", "2:286"),
+    ("What is the opening chapter that is recited in every prayer about?", "1:1-7"),
+    ("How should a believer cope with fear, hunger and losing loved ones?", "2:153-157"),
+    ("Why was Satan thrown out when Adam was created?", "2:30-39"),
+    ("How long must a divorced woman wait before she can remarry?", "2:228-232"),
+    ("Which people were turned into monkeys for fishing on their day of rest?", "2:65-66"),
+    ("What counts as real piety besides the direction you pray to?", "2:177"),
+    ("Can a Muslim man marry a woman who worships idols?", "2:221"),
+    ("Is a husband allowed to be with his wife at night during the fasting month?", "2:187"),
+    ("What does the Quran say about alcohol and gambling?", "2:219"),
+    ("Who are the people that claim to believe but only fool themselves?", "2:8-20"),
+]
+
+# Background of a revelation: relevant are the Asbab passages citing the verses
+CURATED_ASBAB_CASES = [
+    ("How did people react when the prayer direction was changed?", "2:142-144"),
+    ("Why were the companions reluctant to walk between the two hills during pilgrimage?", "2:158"),
+    ("What led to marital relations being allowed on fasting nights?", "2:187"),
+    ("What did people ask the Prophet about the crescent moons?", "2:189"),
+    ("Why was the verse about drinking and games of chance revealed?", "2:219"),
+    ("What happened with the Medinan families whose sons had been raised in another religion?", "2:256"),
+    ("What was the background of the ruling on women during their monthly cycle?", "2:222"),
+    ("Why were believers warned against ruining themselves by holding back their wealth?", "2:195"),
+    ("Who said they were enemies of the angel Gabriel for bringing revelation?", "2:97-98"),
+    ("What incident led to the ban on praying while drunk?", "4:43"),
+]
+
+# Everyday occasions asked about without the wording of the dua's `Context`
+CURATED_DUA_CASES = [
+    ("What should I say before I go to bed at night?", {1}),
+    ("I just opened my eyes in the morning, is there a supplication for that?", {2}),
+    ("What do I say before I use the bathroom?", {3}),
+    ("What do I say once I finish ablution?", {6}),
+    ("What should I recite as I walk into the mosque?", {7}),
+    ("I started eating and forgot to say God's name, what now?", {10}),
+    ("How do I thank God once I have finished my food?", {11}),
+    ("What should I recite when I step out of my house?", {13}),
+    ("What do I say when I set off on a trip?", {15}),
+    ("What is the Islamic way of saying bless you?", {18}),
+    ("What can I pray when I am overwhelmed and in deep trouble?", {28}),
+    ("How do I pray for my mother and father?", {33}),
+    ("What do I say at iftar time?", {34}),
+    ("What should I say when I go to see someone who is ill?", {35}),
+    ("What do I say at the cemetery?", {38}),
+    ("Is there something to recite when a task feels too hard for me?", {39}),
+]
+
+
+@dataclass(frozen=True)
+class GoldCase:
+    id: str
+    corpus: str
+    question: str
+    relevant: frozenset[str]
+    source: str
+
+
+# ------------------- GOLDEN SET -------------------
+
+_REFERENCE_RE = re.compile(r"(?<![\d:])(\d{1,3})\s*:\s*(\d{1,3})(?:\s*[-–—]\s*(\d{1,3}))?(?![\d:])")
+
+
+def referenced_ayahs(reference: str) -> set[str]:
+    """"surah:ayah" keys of every ayah a reference string cites.
+
+    Handles ranges ("18:9–26") and whole surahs in parentheses ("Al-Qasas (28)").
+    """
+    keys = set()
+    for match in _REFERENCE_RE.finditer(reference):
+        surah, first = int(match.group(1)), int(match.group(2))
+        last = int(match.group(3) or first)
+        keys.update(f"{surah}:{a}" for a in range(first, last + 1) if ayah_exists(surah, a))
+    for surah in re.findall(r"\((\d{1,3})\)", reference):
+        surah = int(surah)
+        if 1 <= surah <= len(SURAH_AYAH_COUNTS):
+            keys.update(f"{surah}:{a}" for a in range(1, SURAH_AYAH_COUNTS[surah - 1] + 1))
+    return keys
+
+
+def asbab_passages_citing(ayahs: set[str]) -> frozenset[str]:
+    return frozenset(str(p.id) for p in load_passages() if ayahs.intersection(p.verses))
+
+
+def build_golden_set() -> list[GoldCase]:
+    cases = []
+    with open(STORY_EXAMPLES_PATH, "r", encoding="utf-8") as f:
+        stories = json.load(f)
+    for story in stories:
+        ayahs = referenced_ayahs(story["reference"])
+        cases.append(GoldCase(f"story-{story['id']}-quran", QURAN, story["query"], frozenset(ayahs), "story_exmp.txt"))
+        cases.append(GoldCase(f"story-{story['id']}-asbab", ASBAB, story["query"], asbab_passages_citing(ayahs), "story_exmp.txt"))
+
+    for i, (question, reference) in enumerate(CURATED_QURAN_CASES, start=1):
+        cases.append(GoldCase(f"curated-quran-{i}", QURAN, question, frozenset(referenced_ayahs(reference)), "curated"))
+    for i, (question, reference) in enumerate(CURATED_ASBAB_CASES, start=1):
+        cases.append(GoldCase(f"curated-asbab-{i}", ASBAB, question, asbab_passages_citing(referenced_ayahs(reference)), "curated"))
+    for i, (question, ids) in enumerate(CURATED_DUA_CASES, start=1):
+        cases.append(GoldCase(f"curated-dua-{i}", DUAS, question, frozenset(map(str, ids)), "curated"))
+    return cases
+
+
+# ------------------- RETRIEVERS -------------------
+
+def corpus_ids(corpus: str) -> set[str]:
+    if corpus == QURAN:
+        return {f"{s}:{a}" for s, a in load_quran_index().ayahs}
+    if corpus == ASBAB:
+        return {str(p.id) for p in load_passages()}
+    return {str(i) for i in pd.read_csv(DUAS_CSV_PATH)["ID"]}
+
+
+def bm25_retriever(corpus: str) -> Search:
+    """The in-repo lexical indexes (text_index.BM25Index)."""
+    if corpus == QURAN:
+        index = load_quran_index()
+        index.search_index  # build outside the timed queries
+        return lambda query, k: [f"{a.surah}:{a.ayah}" for a, _ in index.search(query, k)]
+    if corpus == ASBAB:
+        passages = load_passages(ASBAB_CSV_PATH)
+        bm25 = BM25Index([p.text for p in passages])
+        return lambda query, k: [str(passages[i].id) for i, _ in bm25.search(query, k)]
+    duas = pd.read_csv(DUAS_CSV_PATH)
+    ids = [str(i) for i in duas["ID"]]
+    bm25 = BM25Index((duas["Context"].astype(str) + " " + duas["Translation"].astype(str)).tolist())
+    return lambda query, k: [ids[i] for i, _ in bm25.search(query, k)]
+
+
+def load_factory(spec: str) -> Callable[[str], Search | None]:
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "factory")
+
+
+# ------------------- METRICS -------------------
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def evaluate(factory: Callable[[str], Search | None], cases: list[GoldCase], repeat: int = 3) -> dict:
+    """Recall@k (relevant hits in the top k over #relevant, so it never drops as k grows), MRR and latency per corpus."""
+    report = {"corpora": {}, "cases": {}}
+    for corpus in CORPORA:
+        started = time.perf_counter()
+        search = factory(corpus)
+        build_ms = (time.perf_counter() - started) * 1000
+        if search is None:
+            continue
+        available = corpus_ids(corpus)
+        recalls = {k: [] for k in KS}
+        reciprocal_ranks, latencies, uncoverable = [], [], 0
+        for case in (c for c in cases if c.corpus == corpus):
+            relevant = case.relevant & available
+            if not relevant:
+                uncoverable += 1
+                continue
+            timings = []
+            for _ in range(repeat):
+                t = time.perf_counter()
+                ranked = search(case.question, max(KS))
+                timings.append((time.perf_counter() - t) * 1000)
+            latency = min(timings)
+            latencies.append(latency)
+            rank = next((i for i, doc in enumerate(ranked, start=1) if doc in relevant), None)
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+            for k in KS:
+                recalls[k].append(len(relevant.intersection(ranked[:k])) / len(relevant))
+            report["cases"][case.id] = {"rank": rank, "latency_ms": round(latency, 3)}
+        if not latencies:
+            continue
+        report["corpora"][corpus] = {
+            "cases": len(latencies),
+            "uncoverable": uncoverable,
+            **{f"recall@{k}": round(statistics.fmean(v), 4) for k, v in recalls.items()},
+            "mrr": round(statistics.fmean(reciprocal_ranks), 4),
+            "latency_p50_ms": round(percentile(latencies, 50), 3),
+            "latency_p95_ms": round(percentile(latencies, 95), 3),
+            "build_ms": round(build_ms, 1),
+        }
+    return report
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    columns = [*(f"recall@{k}" for k in KS), "mrr", "latency_p50_ms", "latency_p95_ms"]
+    print(f"{'corpus':<7} {'cases':>5} {'skip':>4} " + " ".join(f"{c:>14}" for c in columns))
+    for corpus, row in report["corpora"].items():
+        base = (baseline or {}).get("corpora", {}).get(corpus)
+        cells = []
+        for c in columns:
+            cell = f"{row[c]:.3f}"
+            if base and c in base:
+                cell += f" ({row[c] - base[c]:+.3f})"
+            cells.append(f"{cell:>14}")
+        print(f"{corpus:<7} {row['cases']:>5} {row['uncoverable']:>4} " + " ".join(cells))
+
+
+def regressions(
+    report: dict, baseline: dict, max_quality_drop: float, max_latency_ratio: float, latency_slack_ms: float
+) -> list[str]:
+    problems = []
+    for corpus, base in baseline.get("corpora", {}).items():
+        row = report["corpora"].get(corpus)
+        if row is None:
+            problems.append(f"{corpus}: not evaluated")
+            continue
+        for metric in ("recall@10", "mrr"):
+            if row[metric] < base[metric] - max_quality_drop:
+                problems.append(f"{corpus}: {metric} {base[metric]:.3f} -> {row[metric]:.3f}")
+        # Sub-millisecond timings are noisy, so a small absolute slack is always allowed
+        allowed = max(base["latency_p95_ms"] * max_latency_ratio, base["latency_p95_ms"] + latency_slack_ms)
+        if row["latency_p95_ms"] > allowed:
+            problems.append(f"{corpus}: p95 latency {base['latency_p95_ms']:.2f}ms -> {row['latency_p95_ms']:.2f}ms")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--retriever", help="module:factory to evaluate (default: the BM25 indexes)")
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare against; exits 1 on regression")
+    parser.add_argument("--max-quality-drop", type=float, default=0.02, help="allowed drop in recall@10 / MRR")
+    parser.add_argument("--max-latency-ratio", type=float, default=1.5, help="allowed p95 latency growth")
+    parser.add_argument("--latency-slack-ms", type=float, default=0.5, help="p95 growth always allowed, in ms")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per query (the fastest is kept)")
+    args = parser.parse_args()
+
+    golden = build_golden_set()
+    result = evaluate(load_factory(args.retriever) if args.retriever else bm25_retriever, golden, args.repeat)
+    result["retriever"] = args.retriever or "bm25"
+    result["golden_cases"] = len(golden)
+
+    baseline_report = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline_report = json.load(f)
+    print_report(result, baseline_report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    if baseline_report:
+        found = regressions(result, baseline_report, args.max_quality_drop, args.max_latency_ratio, args.latency_slack_ms)
+        for problem in found:
+            print(f"REGRESSION {problem}")
+        sys.exit(1 if found else 0)
@@ -0,0 +1,78 @@
+"""Sequential vs speculative input guardrails, measured against the stand-in model.
+
+Reports end-to-end latency for on-topic and tripped (off-topic) requests and
+the main-agent tokens wasted on tripped requests in each mode.
+
+    cd backend && python -m benchmarks.speculative_guardrail --requests 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stand_in_server import StandInServer
+
+ON_TOPIC = "user: What does Ayat al-Kursi teach about Allah?"
+# Nothing in it for fallback_replies.obviously_off_topic, so it trips in the guardrail model
+OFF_TOPIC = "user: Which laptop should I buy for editing my holiday photos?"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def measure(agent_module, run_agent, mode: str, prompt: str, n: int) -> list[float]:
+    from agents import InputGuardrailTripwireTriggered
+    from run_context import TadabburContext
+
+    latencies = []
+    for _ in range(n):
+        started = time.perf_counter()
+        try:
+            await run_agent(
+                agent_module.agent, prompt,
+                context=TadabburContext(query=prompt),
+                run_config=agent_module.config,
+                mode=mode,
+            )
+        except InputGuardrailTripwireTriggered:
+            pass
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main(args) -> None:
+    with StandInServer(port=args.port) as server:
+        os.environ["FIREWORKS_BASE_URL"] = server.base_url
+        os.environ.setdefault("FIREWORKS_API_KEY", "stand-in")
+        from agents import set_tracing_disabled
+        import agent as agent_module
+        from speculative import SEQUENTIAL, SPECULATIVE, run_agent
+
+        set_tracing_disabled(True)
+        print(
+            f"{'mode':<12} {'on-topic p50':>13} {'p95':>8} {'tripped p50':>12} {'p95':>8} "
+            f"{'wasted prompt tok/trip':>23} {'wasted output tok/trip':>23}"
+        )
+        for mode in (SEQUENTIAL, SPECULATIVE):
+            ok = await measure(agent_module, run_agent, mode, ON_TOPIC, args.requests)
+            server.reset()
+            tripped = await measure(agent_module, run_agent, mode, OFF_TOPIC, args.requests)
+            await asyncio.sleep(0.1)  # let the server account for cancelled generations
+            main_stats = server.stats.get("main", {})
+            wasted_prompt = main_stats.get("prompt_tokens", 0) / args.requests
+            wasted_output = main_stats.get("completion_tokens", 0) / args.requests
+            print(
+                f"{mode:<12} {statistics.median(ok):>11.0f}ms {percentile(ok, 95):>6.0f}ms "
+                f"{statistics.median(tripped):>10.0f}ms {percentile(tripped, 95):>6.0f}ms "
+                f"{wasted_prompt:>23.0f} {wasted_output:>23.0f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,240 @@
+"""Local stand-in for the Fireworks chat completions endpoint.
+
+Answers like the real agents would (verdict words for the guardrail agents, a
+canned greeting for the fallback agent, a long answer for the main agents)
+after a simulated delay, and counts the tokens it "generates" per role so
+benchmarks can measure latency and wasted tokens without network access.
+
+Like gpt-oss, each reply is reasoning tokens followed by the answer, and both
+count against max_tokens. How much a role reasons scales with the request's
+reasoning_effort (medium when it sends none). The per-role budgets are
+assumptions, not measurements; a reply whose cap runs out before the answer
+comes back empty.
+
+Faults can be injected at startup or at runtime with POST /faults, e.g.
+{"error_rate": 0.3}, {"slow_rate": 0.05, "slow_extra_s": 3} or {"outage": true}.
+
+    python -m benchmarks.stand_in_server --port 8765
+    FIREWORKS_BASE_URL=http://127.0.0.1:8765/v1 python main.py
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from text_index import estimate_tokens
+
+# Words in the user message that make the input guardrail answer UNRELATED
+OFF_TOPIC_MARKERS = ("math", "equation", "python", "javascript", "code", "movie", "football", "weather", "stock", "laptop")
+
+
+@dataclass(frozen=True)
+class RoleProfile:
+    first_token_s: float
+    completion_tokens: int  # the answer itself
+    reasoning_tokens: int = 0  # at medium effort
+
+    def reasoning_for(self, effort: str | None) -> int:
+        return int(self.reasoning_tokens * REASONING_EFFORT_SCALE.get(effort or "medium", 1.0))
+
+
+# Reasoning length relative to medium effort
+REASONING_EFFORT_SCALE = {"low": 0.25, "medium": 1.0, "high": 3.0}
+
+
+@dataclass
+class StandInSettings:
+    tokens_per_second: float = 400.0
+    verdict: RoleProfile = RoleProfile(0.35, 8, 240)  # a one-word answer after a lot of reasoning
+    fallback: RoleProfile = RoleProfile(0.25, 40, 120)
+    main: RoleProfile = RoleProfile(0.45, 400)  # its reasoning is folded into the answer length
+    # Fault injection
+    error_rate: float = 0.0
+    error_status: int = 503
+    slow_rate: float = 0.0
+    slow_extra_s: float = 0.0
+    outage: bool = False
+
+
+def classify_role(system_prompt: str) -> str:
+    if "'UNRELATED'" in system_prompt or "'INVALID'" in system_prompt:
+        return "verdict"
+    if "FallbackResponder" in system_prompt or "polite" in system_prompt:
+        return "fallback"
+    return "main"
+
+
+def reply_for(role: str, system_prompt: str, user_text: str, n_tokens: int) -> str:
+    if role == "verdict":
+        if "'UNRELATED'" in system_prompt:
+            off_topic = any(marker in user_text.lower() for marker in OFF_TOPIC_MARKERS)
+            return "UNRELATED" if off_topic else "RELATED"
+        return "VALID"
+    if role == "fallback":
+        return "Hi there! Im Tadabbur — I specialize in Quranic insights. What would you like to explore today?"
+    filler = " ".join(["reflection"] * max(0, n_tokens - 12))
+    return f"Allah is the Ever-Living, the Sustainer (2:255). {filler}"
+
+
+def structured_reply(response_format: dict, text: str) -> str:
+    """JSON matching a requested json_schema, using `text` for enum/string fields."""
+    schema = response_format.get("json_schema", {}).get("schema", {})
+    obj = {}
+    for name, prop in schema.get("properties", {}).items():
+        if "enum" in prop:
+            obj[name] = text if text in prop["enum"] else prop["enum"][0]
+        elif prop.get("type") == "boolean":
+            obj[name] = text not in ("UNRELATED", "INVALID")
+        else:
+            obj[name] = text
+    return json.dumps(obj)
+
+
+def create_app(settings: StandInSettings | None = None) -> FastAPI:
+    settings = settings or StandInSettings()
+    app = FastAPI(title="Tadabbur stand-in model")
+    app.state.settings = settings
+    app.state.stats = defaultdict(lambda: defaultdict(int))
+
+    @app.get("/stats")
+    async def stats():
+        return {role: dict(values) for role, values in app.state.stats.items()}
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        app.state.stats.clear()
+        return {"ok": True}
+
+    @app.post("/faults")
+    async def set_faults(request: Request):
+        app.state.settings = dataclasses.replace(app.state.settings, **(await request.json()))
+        return dataclasses.asdict(app.state.settings)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        system_prompt = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        user_text = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "user")
+
+        role = classify_role(system_prompt)
+        profile: RoleProfile = getattr(app.state.settings, role)
+        reasoning = profile.reasoning_for(body.get("reasoning_effort"))
+        wanted = reasoning + profile.completion_tokens
+        n_tokens = wanted
+        if body.get("max_tokens") or body.get("max_completion_tokens"):
+            n_tokens = min(n_tokens, int(body.get("max_tokens") or body.get("max_completion_tokens")))
+        prompt_tokens = estimate_tokens(system_prompt + user_text)
+
+        stats = app.state.stats[role]
+        stats["requests"] += 1
+
+        faults: StandInSettings = app.state.settings
+        if faults.outage or random.random() < faults.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": {"message": "injected fault"}}, status_code=faults.error_status)
+        stats["prompt_tokens"] += prompt_tokens
+
+        # Generate "token by token" so a client that goes away stops the meter
+        await asyncio.sleep(profile.first_token_s)
+        if random.random() < faults.slow_rate:
+            stats["slow"] += 1
+            await asyncio.sleep(faults.slow_extra_s)
+        generated, step = 0, 0.02
+        per_step = max(1, int(app.state.settings.tokens_per_second * step))
+        while generated < n_tokens:
+            if await request.is_disconnected():
+                stats["cancelled"] += 1
+                stats["completion_tokens"] += generated
+                return {}
+            await asyncio.sleep(step)
+            generated = min(n_tokens, generated + per_step)
+        stats["completion_tokens"] += generated
+        stats["reasoning_tokens"] += min(generated, reasoning)
+
+        truncated = generated < wanted
+        answer_tokens = generated - reasoning
+        if answer_tokens <= 0 or (truncated and role != "main"):
+            content = ""  # the cap ran out while it was still reasoning (or mid-verdict)
+        else:
+            content = reply_for(role, system_prompt, user_text, answer_tokens)
+        if content and (body.get("response_format") or {}).get("type") == "json_schema":
+            content = structured_reply(body["response_format"], content)
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stand-in"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "length" if truncated else "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": generated,
+                "total_tokens": prompt_tokens + generated,
+                "completion_tokens_details": {"reasoning_tokens": min(generated, reasoning)},
+            },
+        }
+
+    return app
+
+
+class StandInServer:
+    """Runs the stand-in app on a background thread (for benchmarks)."""
+
+    def __init__(self, settings: StandInSettings | None = None, host: str = "127.0.0.1", port: int = 8765):
+        self.app = create_app(settings)
+        self.base_url = f"http://{host}:{port}/v1"
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> "StandInServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+    @property
+    def stats(self) -> dict:
+        return {role: dict(values) for role, values in self.app.state.stats.items()}
+
+    def reset(self) -> None:
+        self.app.state.stats.clear()
+
+    def set_faults(self, **faults) -> None:
+        self.app.state.settings = dataclasses.replace(self.app.state.settings, **faults)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-extra-s", type=float, default=0.0)
+    args = parser.parse_args()
+    settings = StandInSettings(
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_extra_s=args.slow_extra_s,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port)
@@ -0,0 +1,113 @@
+"""Tokens spent by the verdict agents with model profiles off (before) and on (after).
+
+Runs the guardrail verdict agents of agent.py and story_agent.py on a fixed set
+of inputs, once per mode in a fresh process (profiles are applied at import).
+Uses the local stand-in model by default; --live uses the configured provider.
+
+Fewer tokens only count if every call still returns a verdict, so calls that
+give none (cut off by max_tokens) are reported too. The stand-in model reasons
+before it answers, scaled by the reasoning_effort each profile sends, so it
+shows what the effort and cap settings change; its per-effort reasoning
+lengths are assumptions, so the absolute savings come from --live runs.
+
+    cd backend && python -m benchmarks.verdict_tokens
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.stand_in_server import StandInServer
+
+QUESTIONS = [
+    "What does Ayat al-Kursi teach about Allah?",
+    "Explain the opening verses of Surah Al-Baqarah.",
+    "Tell me a story about patience from the Quran.",
+    "Can you help me solve this math equation?",
+    "Which football team won yesterday?",
+]
+REPLIES = [
+    "Patience (sabr) is praised throughout the Quran as a path to Allah's mercy.",
+    "The believers are those who spend from what Allah has provided and trust in Him.",
+    "The best programming language for web development is JavaScript.",
+]
+
+
+async def measure() -> dict:
+    from agents import ModelBehaviorError, Runner, set_tracing_disabled
+    from model_profiles import verdict_text
+    import agent as agent_module
+    import story_agent
+
+    set_tracing_disabled(True)
+    cases = [
+        ("input verdict", agent_module.guardrail_agent, QUESTIONS),
+        ("output verdict", agent_module.output_guard_agent, REPLIES),
+        ("story input verdict", story_agent.guardrail_agent, QUESTIONS),
+        ("story output verdict", story_agent.output_guard_agent, REPLIES),
+    ]
+    totals = {}
+    for name, verdict_agent, inputs in cases:
+        usage = {"calls": 0, "no_verdict": 0, "input_tokens": 0, "output_tokens": 0}
+        for text in inputs:
+            usage["calls"] += 1
+            try:
+                result = await Runner.run(verdict_agent, text)
+            except ModelBehaviorError:
+                usage["no_verdict"] += 1
+                continue
+            usage["no_verdict"] += not verdict_text(result.final_output)
+            usage["input_tokens"] += result.context_wrapper.usage.input_tokens
+            usage["output_tokens"] += result.context_wrapper.usage.output_tokens
+        totals[name] = usage
+    return totals
+
+
+def run_mode(profiles: str, base_url: str | None) -> dict:
+    env = dict(os.environ, MODEL_PROFILES=profiles)
+    if base_url:
+        env["FIREWORKS_BASE_URL"] = base_url
+        env.setdefault("FIREWORKS_API_KEY", "stand-in")
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.verdict_tokens", "--measure"],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def report(base_url: str | None) -> None:
+    before, after = run_mode("off", base_url), run_mode("on", base_url)
+    print(
+        f"{'agent':<22} {'calls':>5} {'out tok before':>15} {'out tok after':>14} {'in tok before':>14} "
+        f"{'in tok after':>13} {'no verdict before':>18} {'after':>6}"
+    )
+    for name in before:
+        b, a = before[name], after[name]
+        print(
+            f"{name:<22} {b['calls']:>5} {b['output_tokens']:>15} {a['output_tokens']:>14} "
+            f"{b['input_tokens']:>14} {a['input_tokens']:>13} {b['no_verdict']:>18} {a['no_verdict']:>6}"
+        )
+    total_b = sum(v["output_tokens"] for v in before.values())
+    total_a = sum(v["output_tokens"] for v in after.values())
+    print(f"{'total output tokens':<22} {'':>5} {total_b:>15} {total_a:>14}  ({100 * (1 - total_a / max(1, total_b)):.0f}% fewer)")
+    lost = sum(v["no_verdict"] for v in after.values())
+    if lost:
+        print(f"warning: {lost} calls gave no verdict with profiles on; the token totals leave them out")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="use FIREWORKS_BASE_URL / the real provider")
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(asyncio.run(measure())))
+    elif args.live:
+        report(None)
+    else:
+        with StandInServer(port=args.port) as server:
+            report(server.base_url)
@@ -0,0 +1,155 @@
+import re
+import time
+from dataclasses import dataclass, field
+
+from quran_index import QuranIndex, arabic_skeleton, ayah_exists, load_quran_index
+
+# Local check of the verse references and Arabic quotes in an agent reply.
+# Runs in a few milliseconds. It only judges the citations: whether the reply
+# stays on topic is still up to the output guardrail.
+
+VALID = "valid"
+INVALID = "invalid"
+INCONCLUSIVE = "inconclusive"
+
+# 2:255, 18:9-26, 18:9–26
+REFERENCE_RE = re.compile(r"(?<![\d:])(\d{1,3})\s*:\s*(\d{1,3})(?:\s*[-–—]\s*(\d{1,3}))?(?![\d:])")
+# A run of at least three Arabic words (letters plus diacritics / Quranic marks)
+_ARABIC_CHARS = r"\u0600-\u06FF\u0750-\u077F\uFB50-\uFDFF\uFE70-\uFEFF"
+_ARABIC_RUN_RE = re.compile(rf"[{_ARABIC_CHARS}]+(?:[ \t]+[{_ARABIC_CHARS}]+){{2,}}")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# Letters Urdu (and Persian) use but Arabic doesn't: such runs are prose, not quotes
+_NON_ARABIC_LETTERS_RE = re.compile(r"[ٹڈڑںےۓھکگیپچژ]")
+# "5:00", "5:30 pm": clock times, not verse references
+_TIME_SUFFIX_RE = re.compile(r"\s*(?:am|pm|a\.m\.|p\.m\.|o'clock|hrs?)\b", re.IGNORECASE)
+# Text just before a number pair that makes it a verse reference ("Surah 2:300",
+# "see 2:300", "(2:300)"), as opposed to a ratio or a score
+_VERSE_CONTEXT_RE = re.compile(
+    r"(?:\b(?:surah?|sura|ayah?|ayat|verses?|qur'?an|see|cf\.?|says)\b[^.\n\d]{0,30}|[(\[]\s*)$", re.IGNORECASE
+)
+
+
+@dataclass
+class Citation:
+    surah: int
+    ayah_start: int
+    ayah_end: int
+    status: str
+    detail: str = ""
+
+    @property
+    def label(self) -> str:
+        if self.ayah_end != self.ayah_start:
+            return f"{self.surah}:{self.ayah_start}-{self.ayah_end}"
+        return f"{self.surah}:{self.ayah_start}"
+
+
+@dataclass
+class Quote:
+    text: str
+    status: str
+    matches: list[tuple[int, int]] = field(default_factory=list)
+    detail: str = ""
+
+
+@dataclass
+class VerificationResult:
+    status: str
+    citations: list[Citation]
+    quotes: list[Quote]
+    elapsed_ms: float
+
+    @property
+    def issues(self) -> list[str]:
+        return [c.detail for c in self.citations if c.status == INVALID] + [
+            q.detail for q in self.quotes if q.status == INVALID
+        ]
+
+
+def _is_time(match: re.Match, text: str) -> bool:
+    return (len(match.group(2)) == 2 and match.group(2).startswith("0")) or bool(
+        _TIME_SUFFIX_RE.match(text, match.end())
+    )
+
+
+def _check_reference(match: re.Match, text: str) -> Citation:
+    # A number pair that isn't a real verse is only a fabricated reference when
+    # the text presents it as one; otherwise it may be a ratio or a score
+    surah, start = int(match.group(1)), int(match.group(2))
+    end = int(match.group(3)) if match.group(3) else start
+    failed = INVALID if _VERSE_CONTEXT_RE.search(text, 0, match.start()) else INCONCLUSIVE
+
+    if end < start:
+        return Citation(surah, start, end, failed, f"{surah}:{start}-{end} is not a valid range")
+    for ayah in (start, end):
+        if not ayah_exists(surah, ayah):
+            return Citation(surah, start, end, failed, f"{surah}:{ayah} does not exist in the Quran")
+    return Citation(surah, start, end, VALID)
+
+
+def _range_skeleton(citation: Citation, index: QuranIndex) -> str:
+    ayahs = (index.get(citation.surah, a) for a in range(citation.ayah_start, citation.ayah_end + 1))
+    return " ".join(a.skeleton_ar for a in ayahs if a is not None)
+
+
+def _check_quote(text: str, block_citations: list[Citation], index: QuranIndex) -> Quote:
+    checkable = [c for c in block_citations if c.status == VALID and index.covers(c.surah)]
+    # A quote may run across the ayahs of a cited range ("(1:1-2)")
+    needle = arabic_skeleton(text)
+    for c in checkable:
+        cited = _range_skeleton(c, index)
+        if needle and (needle in cited or (len(cited) > 20 and cited in needle)):
+            return Quote(text, VALID, [(c.surah, a) for a in range(c.ayah_start, c.ayah_end + 1)])
+
+    matches = index.find_arabic(text)
+    cited = ", ".join(c.label for c in checkable)
+    if matches and checkable:
+        found = ", ".join(f"{s}:{a}" for s, a in matches[:3])
+        return Quote(text, INVALID, matches, f"Arabic quoted as {cited} is actually {found}")
+    if matches:
+        return Quote(text, VALID, matches)
+    if checkable:
+        # Cited as a verse the dataset holds, but it isn't that verse (or any other)
+        return Quote(text, INVALID, detail=f"Arabic quoted as {cited} not found in the verse text")
+    # Uncited Arabic that is no verse: a dua, a hadith or prose
+    return Quote(text, INCONCLUSIVE)
+
+
+def verify_citations(output: str, index: QuranIndex | None = None) -> VerificationResult:
+    """Extracts surah:ayah references and quoted Arabic from `output` and checks
+    them against `QuranDataset.csv`.
+
+    `valid`: something verifiable was found and all of it checks out.
+    `invalid`: a reference to a verse that doesn't exist, or Arabic cited as a
+    verse that it isn't.
+    `inconclusive`: nothing checkable, or only number pairs and Arabic that
+    may not be citations at all.
+    """
+    started = time.perf_counter()
+    index = index or load_quran_index()
+    text = str(output)
+
+    citations: list[Citation] = []
+    quotes: list[Quote] = []
+    # Quotes are matched against the references of the same paragraph
+    for block in _PARAGRAPH_RE.split(text):
+        block_citations = [_check_reference(m, block) for m in REFERENCE_RE.finditer(block) if not _is_time(m, block)]
+        citations.extend(block_citations)
+        for m in _ARABIC_RUN_RE.finditer(block):
+            if not _NON_ARABIC_LETTERS_RE.search(m.group(0)):
+                quotes.append(_check_quote(m.group(0), block_citations, index))
+
+    checked = citations + quotes
+    if any(item.status == INVALID for item in checked):
+        status = INVALID
+    elif checked and all(item.status == VALID for item in checked):
+        status = VALID
+    else:
+        status = INCONCLUSIVE
+
+    return VerificationResult(
+        status=status,
+        citations=citations,
+        quotes=quotes,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
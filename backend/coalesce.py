@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+# Single-flight for chat runs: when many users send the same question at once
+# (a verse of the day goes out), only the first request starts the agent run
+# and the identical ones that arrive while it is in flight wait for it and get
+# the same result. Identical means the same target agent and exactly the same
+# conversation text sent to the model: a reply can draw on any earlier turn, so
+# it is only shared with callers who sent that whole history themselves.
+
+COALESCE_ENABLED = os.getenv("CHAT_COALESCE_ENABLED", "1") == "1"
+
+
+def coalesce_key(conversation: str, agent_name: str) -> str:
+    """Key of a chat run: the target agent plus the full conversation it receives."""
+    digest = hashlib.blake2b(agent_name.encode("utf-8"), digest_size=16)
+    digest.update(b"\0" + conversation.encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass(eq=False)
+class _Flight:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class SingleFlight:
+    """Runs one call per key at a time and hands its outcome to every concurrent caller.
+
+    Results and exceptions (guardrail tripwires, upstream errors) reach all
+    waiters alike. A waiter that is cancelled (its deadline passed, its client
+    went away) just stops waiting; the shared run is cancelled only when no
+    one is waiting for it anymore.
+    """
+
+    def __init__(self, enabled: bool = COALESCE_ENABLED):
+        self.enabled = enabled
+        self.flights: dict[str, _Flight] = {}
+        self.counters: Counter[str] = Counter()
+
+    async def run(self, key: str, call: Callable[[], Awaitable]) -> tuple[object, bool]:
+        """Result of `call()` (or of the identical call in flight) and whether it was shared."""
+        if not self.enabled:
+            self.counters["runs"] += 1
+            return await call(), False
+
+        flight = self.flights.get(key)
+        shared = flight is not None
+        if shared:
+            self.counters["deduplicated"] += 1
+        else:
+            flight = _Flight(asyncio.create_task(call()))
+            self.flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finished(key, flight))
+            self.counters["runs"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Everyone waiting on this run left: don't keep paying for it
+                self.counters["abandoned"] += 1
+                if self.flights.get(key) is flight:
+                    del self.flights[key]
+                flight.task.cancel()
+
+    def _finished(self, key: str, flight: _Flight) -> None:
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+        if not flight.task.cancelled() and flight.task.exception() is not None:
+            self.counters["failed"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self.flights),
+            "waiting": sum(f.waiters for f in self.flights.values()),
+            "runs": self.counters["runs"],
+            "deduplicated": self.counters["deduplicated"],
+            "abandoned": self.counters["abandoned"],
+            "failed": self.counters["failed"],
+        }
+
+
+chat_flights = SingleFlight()
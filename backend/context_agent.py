@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 import asyncio
 import pandas as pd
 from pydantic import BaseModel
+from asbab_pipeline import load_passages
 
 # Load .env
 load_dotenv()
@@ -23,12 +24,10 @@ if not FIRE_WORKS_API:
 CSV_PATH = "asbabul_nuzul_text.csv"
 
 # async def main():
-    
-df = pd.read_csv(CSV_PATH)
-texts = df['text'].tolist()
 
-
-csv_content = "\n\n".join(texts[:50])  
+# Cleaned passages (headers, page numbers and line wraps fixed) instead of the raw OCR pages
+passages = load_passages(CSV_PATH)
+csv_content = "\n\n".join(p.text for p in passages if p.first_page <= 50)
 # Initialize LLM client
 client = AsyncOpenAI(
     api_key= FIRE_WORKS_API,
@@ -0,0 +1,285 @@
+import asyncio
+import contextlib
+import datetime as dt
+import fcntl
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+from agents import InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered
+from fastapi import APIRouter, Request, Response
+
+from intent_router import DUAS_CSV_PATH
+from quran_api import if_none_match
+from quran_index import load_quran_index
+
+logger = logging.getLogger(__name__)
+
+# Verse and dua of the day, picked once per day by a background task instead
+# of through the agent pipeline. The picks are a hash of the date, so every
+# worker agrees on them without talking to each other. The optional
+# reflection is the only model call: one worker takes a file lock and writes
+# it to the day's JSON file, and the others pick it up from there. /api/daily
+# serves the result with caching that lasts until the next day starts.
+
+DAILY_TIMEZONE = ZoneInfo(os.getenv("DAILY_TIMEZONE", "UTC"))
+DAILY_CACHE_DIR = os.getenv("DAILY_CACHE_DIR", ".cache/daily")
+DAILY_REFLECTION_ENABLED = os.getenv("DAILY_REFLECTION_ENABLED", "1") == "1"
+DAILY_REFLECTION_TIMEOUT_S = float(os.getenv("DAILY_REFLECTION_TIMEOUT_S", "120"))
+DAILY_REFLECTION_ATTEMPTS = int(os.getenv("DAILY_REFLECTION_ATTEMPTS", "3"))
+# How often workers look for the reflection (or retry generating it)
+DAILY_REFRESH_S = float(os.getenv("DAILY_REFRESH_S", "300"))
+DAILY_KEEP_DAYS = 7
+
+# Until the reflection is in, clients should come back soon
+PENDING_CACHE_CONTROL = f"public, max-age={int(DAILY_REFRESH_S)}"
+
+REFLECTION_PROMPT = (
+    "Share a short reflection (3-4 sentences) on Surah {surah_name} {surah}:{ayah}: \"{text}\". "
+    "Explain what it teaches and how someone can live by it today."
+)
+
+router = APIRouter(prefix="/api", tags=["daily"])
+
+
+@dataclass
+class DailyContent:
+    date: str
+    ayah: dict
+    dua: dict
+    reflection: str | None = None
+    generated_at: str | None = None
+    attempts: int = 0  # reflection attempts so far, shared by the workers through the file
+
+    @property
+    def wants_reflection(self) -> bool:
+        return DAILY_REFLECTION_ENABLED and self.reflection is None and self.attempts < DAILY_REFLECTION_ATTEMPTS
+
+    def render(self) -> tuple[bytes, str]:
+        public = {key: value for key, value in asdict(self).items() if key != "attempts"}
+        body = json.dumps(public, ensure_ascii=False).encode("utf-8")
+        return body, '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def today() -> dt.date:
+    return dt.datetime.now(DAILY_TIMEZONE).date()
+
+
+def seconds_until_tomorrow() -> float:
+    now = dt.datetime.now(DAILY_TIMEZONE)
+    tomorrow = dt.datetime.combine(now.date() + dt.timedelta(days=1), dt.time(), DAILY_TIMEZONE)
+    return max(1.0, (tomorrow - now).total_seconds())
+
+
+def _pick(kind: str, day: dt.date, size: int) -> int:
+    digest = hashlib.blake2b(f"{kind}:{day.isoformat()}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % size
+
+
+@lru_cache(maxsize=1)
+def _duas() -> pd.DataFrame:
+    return pd.read_csv(DUAS_CSV_PATH)
+
+
+def pick(day: dt.date) -> DailyContent:
+    """The day's ayah and dua; the same on every worker and every restart."""
+    index = load_quran_index()
+    numbers = sorted(index.by_number)
+    ayah = index.by_number[numbers[_pick("ayah", day, len(numbers))]]
+    duas = _duas()
+    row = duas.iloc[_pick("dua", day, len(duas))]
+    return DailyContent(
+        date=day.isoformat(),
+        ayah=ayah.record,
+        dua={
+            "id": int(row["ID"]),
+            "context": str(row["Context"]).title(),
+            "arabic": row["Arabic_Text"],
+            "translation": row["Translation"],
+            "reference": row["Reference/Source"],
+        },
+    )
+
+
+# ------------------- STORAGE -------------------
+
+def _path(day: dt.date, suffix: str = "json") -> str:
+    return os.path.join(DAILY_CACHE_DIR, f"daily-{day.isoformat()}.{suffix}")
+
+
+def load(day: dt.date) -> DailyContent | None:
+    try:
+        with open(_path(day), "r", encoding="utf-8") as f:
+            return DailyContent(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save(content: DailyContent, replace: bool = True) -> None:
+    """Writes the day's file atomically; with replace=False an existing file is kept."""
+    os.makedirs(DAILY_CACHE_DIR, exist_ok=True)
+    path = _path(dt.date.fromisoformat(content.date))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(content), f, ensure_ascii=False)
+    if replace:
+        os.replace(tmp, path)
+        return
+    try:
+        os.link(tmp, path)  # fails if another worker wrote the file first
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+
+
+def _prune(keep_from: dt.date) -> None:
+    for name in os.listdir(DAILY_CACHE_DIR):
+        stem = name.removeprefix("daily-").split(".", 1)[0]
+        try:
+            old = dt.date.fromisoformat(stem) < keep_from
+        except ValueError:
+            continue
+        if old:
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(DAILY_CACHE_DIR, name))
+
+
+@contextlib.contextmanager
+def _generation_lock(day: dt.date):
+    """Yields True in the one process (across workers) that should call the model."""
+    os.makedirs(DAILY_CACHE_DIR, exist_ok=True)
+    with open(_path(day, "lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+# ------------------- REFLECTION -------------------
+
+async def generate_reflection(content: DailyContent) -> str:
+    """One run of the main agent on the day's ayah."""
+    import agent as agent_module
+    from agents import Runner
+    from run_context import TadabburContext
+
+    a = content.ayah
+    prompt = REFLECTION_PROMPT.format(
+        surah_name=a.get("surah_name_roman"), surah=a.get("surah_no"), ayah=a.get("ayah_no_surah"), text=a.get("ayah_en")
+    )
+    async with asyncio.timeout(DAILY_REFLECTION_TIMEOUT_S):
+        result = await Runner.run(
+            agent_module.agent, prompt, run_config=agent_module.config, context=TadabburContext(query=prompt)
+        )
+    return str(result.final_output)
+
+
+# ------------------- SCHEDULER -------------------
+
+class DailyJob:
+    def __init__(self):
+        self.content: DailyContent | None = None
+        self.rendered: tuple[bytes, str] | None = None
+        self._task: asyncio.Task | None = None
+
+    def _set(self, content: DailyContent) -> None:
+        if content != self.content:
+            self.content = content
+            self.rendered = content.render()
+
+    def current(self) -> DailyContent:
+        """Today's content; picked on the spot if the job hasn't caught up with the date yet."""
+        day = today()
+        if self.content is None or self.content.date != day.isoformat():
+            self._set(load(day) or pick(day))
+        return self.content
+
+    @property
+    def complete(self) -> bool:
+        return self.content is not None and not self.content.wants_reflection
+
+    async def refresh(self) -> None:
+        day = today()
+        stored = load(day)
+        if stored is None:
+            save(await asyncio.to_thread(pick, day), replace=False)
+            _prune(day - dt.timedelta(days=DAILY_KEEP_DAYS))
+            stored = load(day)
+        self._set(stored)
+        if not stored.wants_reflection:
+            return
+
+        with _generation_lock(day) as owner:
+            if not owner:
+                return  # another worker is generating it; picked up on a later refresh
+            stored = load(day) or stored
+            if stored.wants_reflection:
+                stored.attempts += 1
+                try:
+                    stored.reflection = await generate_reflection(stored)
+                except (InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered) as e:
+                    # The guardrail's reply says why the reflection was rejected; retried later
+                    result = e.guardrail_result
+                    logger.warning("daily reflection rejected by a guardrail", extra={"fields": {
+                        "date": stored.date, "attempt": stored.attempts, "guardrail": result.guardrail.get_name(),
+                        "reason": getattr(result.output, "output_info", None),
+                    }})
+                except Exception as e:
+                    # Deadline or provider outage: serve without it, retry later
+                    logger.warning(f"daily reflection failed (attempt {stored.attempts}): {e!r}")
+                else:
+                    stored.generated_at = dt.datetime.now(DAILY_TIMEZONE).isoformat(timespec="seconds")
+                    logger.info("daily reflection generated", extra={"fields": {"date": stored.date}})
+                save(stored)
+            self._set(stored)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("daily content refresh failed")
+            # Next check: soon while the reflection is missing, otherwise at rollover
+            wait = seconds_until_tomorrow() + 1
+            if not self.complete:
+                wait = min(wait, DAILY_REFRESH_S)
+            await asyncio.sleep(wait)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="daily-content")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+job = DailyJob()
+
+
+@router.get("/daily")
+async def get_daily(request: Request):
+    """Verse, dua and (once generated) reflection of the day."""
+    job.current()
+    body, etag = job.rendered
+    if job.complete:
+        cache_control = f"public, max-age={int(seconds_until_tomorrow())}, stale-while-revalidate=3600"
+    else:
+        cache_control = PENDING_CACHE_CONTROL
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
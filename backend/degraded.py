@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+
+from intent_router import DUA, DUA_MATCH_SCORE, DUAS_CSV_PATH, Route
+from quran_index import load_quran_index
+from resilience import UNAVAILABLE_MESSAGE
+from text_index import BM25Index
+
+# Per-request deadline for /api/chat and /ws/chat. When it is about to pass,
+# or the provider circuit is open, the reply is built locally from the
+# datasets instead: matching ayahs or duas, clearly marked as degraded.
+
+CHAT_DEADLINE_S = float(os.getenv("CHAT_DEADLINE_S", "20"))
+# Time kept back from the deadline to build and send the local answer
+DEGRADE_MARGIN_S = float(os.getenv("CHAT_DEGRADE_MARGIN_S", "0.5"))
+MAX_DEGRADED_AYAHS = 3
+MAX_DEGRADED_DUAS = 2
+# Minimum BM25 score for an ayah to count as a match
+AYAH_MATCH_SCORE = 3.0
+
+DEADLINE, CIRCUIT_OPEN, UNAVAILABLE = "deadline", "circuit_open", "unavailable"
+
+DEGRADED_NOTICE = (
+    "⚠️ Tadabbur is answering in limited mode right now, so this reply comes straight "
+    "from the Quran and duas datasets without commentary."
+)
+
+
+@dataclass
+class DegradedAnswer:
+    reason: str
+    text: str
+
+    def http_payload(self) -> dict:
+        return {"reply": self.text, "degraded": True, "reason": self.reason}
+
+    def ws_payload(self) -> dict:
+        return {"type": "assistance_response", "content": self.text, "degraded": True, "reason": self.reason}
+
+
+class Deadline:
+    """Absolute deadline of one chat request."""
+
+    def __init__(self, seconds: float = CHAT_DEADLINE_S):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def timeout(self):
+        """`async with` block that stops the model run in time to still answer locally."""
+        return asyncio.timeout(max(0.0, self.remaining() - DEGRADE_MARGIN_S))
+
+
+@lru_cache(maxsize=1)
+def _duas() -> tuple[pd.DataFrame, BM25Index]:
+    df = pd.read_csv(DUAS_CSV_PATH)
+    return df, BM25Index((df["Context"].astype(str) + " " + df["Translation"].astype(str)).tolist())
+
+
+def _ayah_lines(query: str) -> list[str]:
+    lines = []
+    for ayah, score in load_quran_index().search(query, k=MAX_DEGRADED_AYAHS):
+        if score < AYAH_MATCH_SCORE:
+            break
+        r = ayah.record
+        lines.append(
+            f"**Surah {r.get('surah_name_roman')} ({r.get('surah_name_en')}) {ayah.surah}:{ayah.ayah}** "
+            f"— {r.get('place_of_revelation')}\n{ayah.text_ar}\n{ayah.text_en}"
+        )
+    return lines
+
+
+def _dua_lines(query: str, min_score: float) -> list[str]:
+    df, index = _duas()
+    lines = []
+    for doc_id, score in index.search(query, k=MAX_DEGRADED_DUAS):
+        if score < min_score:
+            break
+        row = df.iloc[doc_id]
+        lines.append(
+            f"**{str(row['Context']).title()}**\n{row['Arabic_Text']}\n{row['Translation']}\n"
+            f"Reference: {row['Reference/Source']}"
+        )
+    return lines
+
+
+def degraded_answer(query: str, route: Route | None, reason: str) -> DegradedAnswer:
+    """Local answer for `query`; falls back to the plain unavailable message when nothing matches."""
+    if route is not None and route.intent == DUA:
+        lines = _dua_lines(query, min_score=0.0) or _ayah_lines(query)
+    else:
+        lines = _ayah_lines(query) or _dua_lines(query, min_score=DUA_MATCH_SCORE)
+    if not lines:
+        return DegradedAnswer(reason, UNAVAILABLE_MESSAGE)
+    return DegradedAnswer(reason, DEGRADED_NOTICE + "\n\n" + "\n\n".join(lines))
@@ -0,0 +1,272 @@
+import re
+from collections import Counter
+
+from agents import Agent, Runner
+
+from citation_verifier import REFERENCE_RE
+from intent_router import PROPHETS
+from text_index import STOPWORDS, normalize_arabic
+
+# Fixed replies for guardrail tripwires. A greeting, an off-topic question or
+# a reply that drifted gets its wording from the templates below, in the
+# user's language, without a model call. fallback_agent only runs when the
+# language can't be told locally. Greetings and plainly off-topic questions
+# (code, maths, sports, ... with nothing Quranic in them) are answered before
+# the guardrail model is even asked.
+
+GREETING, OFF_TOPIC, OUTPUT_DRIFT = "greeting", "off_topic", "output_drift"
+QURAN_SCOPE, STORY_SCOPE = "quran", "story"
+EN, AR, UR, UR_LATN = "en", "ar", "ur", "ur-Latn"
+
+_stats: Counter[str] = Counter()
+
+# ------------------- TEMPLATES -------------------
+
+GREETING_OPENING = {
+    EN: "Hi there!",
+    AR: "أهلًا بك!",
+    UR: "خوش آمدید!",
+    UR_LATN: "Khush aamdeed!",
+}
+SALAM_OPENING = {
+    EN: "Wa alaikum assalam!",
+    AR: "وعليكم السلام ورحمة الله!",
+    UR: "وعلیکم السلام!",
+    UR_LATN: "Wa alaikum assalam!",
+}
+GREETING_BODY = {
+    EN: (
+        "I'm Tadabbur — your Quran companion. You can ask me about ayahs and their meaning, tafsir, "
+        "the reasons of revelation, stories of the prophets in the Quran, or duas for daily life. "
+        "What would you like to explore today?"
+    ),
+    AR: (
+        "أنا تدبّر، رفيقك مع القرآن الكريم. يمكنك أن تسألني عن الآيات ومعانيها، والتفسير، وأسباب النزول، "
+        "وقصص الأنبياء في القرآن، والأدعية اليومية. ماذا تحب أن نتدبّر اليوم؟"
+    ),
+    UR: (
+        "میں تدبّر ہوں، قرآن کے سفر میں آپ کا ساتھی۔ آپ مجھ سے آیات اور ان کے معانی، تفسیر، اسبابِ نزول، "
+        "قرآن میں انبیاء کے قصے یا روزمرہ کی دعاؤں کے بارے میں پوچھ سکتے ہیں۔ آج آپ کیا جاننا چاہیں گے؟"
+    ),
+    UR_LATN: (
+        "Main Tadabbur hoon — Quran ke safar mein aap ka saathi. Aap mujh se ayaat aur un ke maani, tafseer, "
+        "asbab-e-nuzool, anbiya ke Qurani qissay ya rozmarra ki duaon ke baare mein pooch sakte hain. "
+        "Aaj aap kya jaanna chahenge?"
+    ),
+}
+
+TEMPLATES: dict[tuple[str, str], dict[str, str]] = {
+    (OFF_TOPIC, QURAN_SCOPE): {
+        EN: (
+            "Sorry, that's outside what I can help with. I'm Tadabbur, and I only answer questions about "
+            "the Quran — its ayahs, tafsir, stories and duas — not topics like maths or technology. "
+            "Is there something from the Quran you'd like to reflect on?"
+        ),
+        AR: (
+            "عذرًا، هذا خارج ما أستطيع المساعدة فيه. أنا تدبّر، وأجيب فقط عن الأسئلة المتعلقة بالقرآن الكريم "
+            "من آيات وتفسير وقصص وأدعية، لا عن موضوعات كالرياضيات أو التقنية. هل هناك ما تودّ تدبّره من القرآن؟"
+        ),
+        UR: (
+            "معذرت، یہ میرے دائرے سے باہر ہے۔ میں تدبّر ہوں اور صرف قرآن سے متعلق سوالات کا جواب دیتا ہوں — "
+            "آیات، تفسیر، قصص اور دعائیں — ریاضی یا ٹیکنالوجی جیسے موضوعات نہیں۔ کیا قرآن سے کچھ ایسا ہے جس پر آپ غور کرنا چاہیں گے؟"
+        ),
+        UR_LATN: (
+            "Maazrat, yeh mere daayre se baahar hai. Main Tadabbur hoon aur sirf Quran se mutaliq sawalon ka "
+            "jawab deta hoon — ayaat, tafseer, qissay aur duayein — maths ya technology jaise mauzoo nahin. "
+            "Kya Quran se kuch aisa hai jis par aap ghaur karna chahenge?"
+        ),
+    },
+    (OFF_TOPIC, STORY_SCOPE): {
+        EN: (
+            "Sorry, I can only create short moral stories inspired by the Quran. "
+            "Try asking for the story of a prophet or a lesson from a Quranic verse."
+        ),
+        AR: "عذرًا، أستطيع فقط أن أروي قصصًا أخلاقية قصيرة مستوحاة من القرآن. جرّب أن تطلب قصة نبيّ أو عبرة من آية.",
+        UR: "معذرت، میں صرف قرآن سے ماخوذ مختصر اخلاقی کہانیاں سنا سکتا ہوں۔ کسی نبی کا قصہ یا کسی آیت کا سبق پوچھ کر دیکھیں۔",
+        UR_LATN: (
+            "Maazrat, main sirf Quran se li gayi mukhtasar akhlaqi kahaniyan suna sakta hoon. "
+            "Kisi nabi ka qissa ya kisi ayat ka sabaq pooch kar dekhein."
+        ),
+    },
+    (OUTPUT_DRIFT, QURAN_SCOPE): {
+        EN: (
+            "Sorry, I can only provide responses based on Quranic content. Could you ask again, "
+            "perhaps naming the surah, ayah or topic you have in mind?"
+        ),
+        AR: "عذرًا، لا أقدّم إلا إجابات مبنية على القرآن الكريم. هل يمكنك إعادة السؤال مع ذكر السورة أو الآية أو الموضوع؟",
+        UR: "معذرت، میں صرف قرآنی مواد پر مبنی جواب دے سکتا ہوں۔ کیا آپ سورت، آیت یا موضوع کا ذکر کر کے دوبارہ پوچھ سکتے ہیں؟",
+        UR_LATN: (
+            "Maazrat, main sirf Qurani mawaad par mabni jawab de sakta hoon. Kya aap surah, ayat ya "
+            "mauzoo ka zikr kar ke dobara pooch sakte hain?"
+        ),
+    },
+    (OUTPUT_DRIFT, STORY_SCOPE): {
+        EN: (
+            "Sorry, that story drifted away from the Quranic teachings. "
+            "Please ask again and I'll keep it to a Quran-inspired moral story."
+        ),
+        AR: "عذرًا، ابتعدت تلك القصة عن تعاليم القرآن. اطلبها مرة أخرى وسألتزم بقصة أخلاقية مستوحاة من القرآن.",
+        UR: "معذرت، وہ کہانی قرآنی تعلیمات سے ہٹ گئی۔ دوبارہ پوچھیں، میں اسے قرآن سے ماخوذ اخلاقی کہانی تک محدود رکھوں گا۔",
+        UR_LATN: (
+            "Maazrat, woh kahani Qurani taleemat se hat gayi. Dobara poochein, main use Quran se li gayi "
+            "akhlaqi kahani tak mehdood rakhunga."
+        ),
+    },
+}
+
+# ------------------- CLASSIFICATION -------------------
+
+_ARABIC_SCRIPT_RE = re.compile(r"[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]")
+# Letters Urdu uses and Arabic doesn't (Persian shares ک/ی/گ, so those don't count)
+_URDU_LETTERS_RE = re.compile(r"[ٹڈڑںےۓھ]")
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+ROMAN_URDU_WORDS = frozenset("""
+kya kyun kyon hai hain mujhe mujhay aap ap kaise kaisay nahi nahin batao bataen bataiye karo kr kar
+ka ki ke ko se hum tum yeh ye woh wo acha accha shukriya bhai behen kahani sunao chahiye likh likho
+banao dein dijiye haal theek
+""".split())
+# Common English words beyond the stopword list, so short questions are recognised
+ENGLISH_WORDS = STOPWORDS | frozenset("""
+hi hello hey thanks thank good morning evening night help explain write code solve best who whats
+something anything know need want like just not no yes ok okay
+""".split())
+
+_SALAM_RE = re.compile(
+    r"\b(as+[- ]?sal[ae]+m[uoa]?[- ]?(alaikum|alaykum|alaikom|alykum|aleikum)|salam|salaam|aoa)\b"
+    r"|السلام عليكم|السلام علیکم|اسلام علیکم|سلام",
+)
+_GREETING_RE = re.compile(
+    r"\b(hi|hii+|hello|hey|hiya|greetings|good (morning|afternoon|evening)|adaab)\b|مرحبا|اهلا|أهلا|اهلا وسهلا"
+)
+# Words that may surround a greeting without turning it into a question
+_GREETING_FILLER = frozenset(normalize_arabic("""
+there tadabbur bot everyone all friend dear brother sister sir madam how are you r u doing hope well
+wa wr wb rahmatullah wabarakatuh warahmatullahi wabarakatuhu o and to
+bhai behen ji kya haal hai hain kaise ho aap sab theek khairiyat
+و ورحمة الله وبركاته
+""").split())
+
+# Plainly off-topic requests; only trusted when nothing Quranic is in the text
+_OFF_TOPIC_RE = re.compile(
+    r"\b(python|javascript|java|c\+\+|sql|html|css|code|coding|program(ming)?|debug|compile|algorithm|"
+    r"equation|integral|derivative|calculus|algebra|solve for|weather|forecast|football|cricket score|"
+    r"match score|bitcoin|crypto(currency)?|stock price|recipe|movie|netflix|song lyrics|video game)\b"
+    r"|\d+\s*[-+*/^]\s*\d+\s*=?"
+)
+_PROPHETS_RE = re.compile(rf"\b({'|'.join(PROPHETS)})\b")
+_ISLAMIC_RE = re.compile(
+    r"\b(quran|qur'an|koran|ayah?|ayat|aya|surah?|sura|allah|god|islam\w*|muslim\w*|prophet\w*|nabi|rasul|"
+    r"hadith|sunnah|dua\w*|tafs[ie]+r|deen|iman|salah|salat|namaz|zakat|hajj|ramadan|fasting|fasts?|halal|haram|"
+    r"jannah|jahannam|akhirah|angel\w*|jinn|sins?|sinful|forgive\w*|prayer\w*|pray\w*|faith|worship\w*)\b"
+    r"|[؀-ۿ]"
+)
+
+
+def detect_language(text: str) -> str | None:
+    """en / ar / ur / ur-Latn, or None when it's another language (or can't be told)."""
+    letters = [c for c in text if c.isalpha()]
+    if not letters:
+        return EN
+    arabic_script = len(_ARABIC_SCRIPT_RE.findall(text))
+    if arabic_script / len(letters) > 0.5:
+        if _URDU_LETTERS_RE.search(text):
+            return UR
+        if not re.search(r"[کیگپچژ]", text):
+            return AR
+        # Urdu or Persian; a salam spelled this way ("اسلام علیکم") is Urdu here
+        return UR if _SALAM_RE.search(_normalized(text)) else None
+    if sum(c.isascii() for c in letters) / len(letters) < 0.9:
+        return None
+    words = [w.lower() for w in _WORD_RE.findall(text)]
+    roman_urdu = sum(w in ROMAN_URDU_WORDS for w in words)
+    english = sum(w in ENGLISH_WORDS for w in words)
+    if roman_urdu >= 2 and roman_urdu > english:
+        return UR_LATN
+    if english or len(words) <= 3:
+        return EN
+    return None
+
+
+def _normalized(text: str) -> str:
+    return " ".join(normalize_arabic(text).lower().split())
+
+
+def greeting_kind(text: str) -> str | None:
+    """"salam", "hello" or None when the message is more than a greeting."""
+    normalized = _normalized(text)
+    salam = _SALAM_RE.search(normalized)
+    hello = _GREETING_RE.search(normalized)
+    if not salam and not hello:
+        return None
+    rest = _GREETING_RE.sub(" ", _SALAM_RE.sub(" ", normalized))
+    if any(word not in _GREETING_FILLER for word in _WORD_RE.findall(rest)):
+        return None
+    return "salam" if salam else "hello"
+
+
+def mentions_off_topic(text: str) -> bool:
+    """Whether `text` touches a plainly off-topic subject at all, Quranic words or not."""
+    return bool(_OFF_TOPIC_RE.search(text.lower()))
+
+
+def obviously_off_topic(text: str) -> bool:
+    """Clearly unrelated requests (code, maths, sports, ...) with nothing Quranic in them."""
+    # A "2:255" or "2:1-5" reference is a Quranic request, and its range is not arithmetic
+    if REFERENCE_RE.search(text):
+        return False
+    # Generic words like "story" or "explain" don't make a coding request Quranic;
+    # a prophet's name does
+    lowered = text.lower()
+    return bool(_OFF_TOPIC_RE.search(lowered)) and not _ISLAMIC_RE.search(lowered) and not _PROPHETS_RE.search(lowered)
+
+
+# ------------------- REPLIES -------------------
+
+def templated_reply(reason: str, text: str, scope: str = QURAN_SCOPE) -> str | None:
+    """The fixed reply for `reason` in the language of `text`, or None if the language is unknown."""
+    language = detect_language(text)
+    if language is None:
+        return None
+    kind = greeting_kind(text) if reason != OUTPUT_DRIFT else None
+    if reason == GREETING or kind:
+        opening = (SALAM_OPENING if kind == "salam" else GREETING_OPENING)[language]
+        return f"{opening} {GREETING_BODY[language]}"
+    return TEMPLATES[(reason, scope)][language]
+
+
+def local_reply(text: str, scope: str = QURAN_SCOPE) -> str | None:
+    """Reply for greetings and plainly off-topic input, so no guardrail model call is needed."""
+    if greeting_kind(text):
+        reply = templated_reply(GREETING, text, scope)
+        reason = GREETING
+    elif obviously_off_topic(text):
+        reply = templated_reply(OFF_TOPIC, text, scope)
+        reason = OFF_TOPIC
+    else:
+        return None
+    if reply is not None:
+        _stats[f"{reason}: local"] += 1
+    return reply
+
+
+async def fallback_reply(
+    reason: str, text: str, scope: str, fallback_agent: Agent, fallback_input, context=None
+) -> str:
+    """Templated reply for `reason`; runs `fallback_agent` on `fallback_input` only when
+    the user's language can't be told locally."""
+    reply = templated_reply(reason, text, scope)
+    if reply is not None:
+        _stats[f"{reason}: template"] += 1
+        return reply
+    _stats[f"{reason}: model"] += 1
+    result = await Runner.run(fallback_agent, fallback_input, context=context)
+    if not str(result.final_output or "").strip():
+        # The model spent its whole output budget on reasoning
+        _stats[f"{reason}: empty model reply"] += 1
+        return TEMPLATES[(reason, scope)][EN]
+    return result.final_output
+
+
+def fallback_stats() -> dict:
+    return dict(_stats)
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Literal
+
+import pandas as pd
+from agents import function_tool
+
+from asbab_pipeline import ASBAB_CSV_PATH, load_passages
+from intent_router import DUAS_CSV_PATH
+from quran_index import load_quran_index
+from text_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+# One local search over every dataset: the query runs against each source's
+# index concurrently, scores are put on a common 0..1 scale (how much of the
+# query a document covers) and the best hits come back as short citations
+# grouped by source. Exposed to the agents as the `search_sources` tool.
+
+QURAN, TAFSIR, ASBAB, DUAS = "quran", "tafsir", "asbab", "duas"
+
+TAFSIR_CSV_PATH = "quran_tafseer_hf.csv"
+# Per-source budget; a source that misses it is left out of the results
+SOURCE_TIMEOUT_S = float(os.getenv("FEDERATED_SOURCE_TIMEOUT_S", "2"))
+# Hits covering less of the query than this are noise
+MIN_SCORE = float(os.getenv("FEDERATED_MIN_SCORE", "0.2"))
+SNIPPET_CHARS = 280
+
+
+@dataclass
+class Citation:
+    source: str
+    ref: str  # "2:255", dua id, "p. 12-13", ...
+    title: str
+    text: str
+    score: float  # normalized, 0..1
+
+
+@dataclass
+class SearchResults:
+    query: str
+    citations: list[Citation] = field(default_factory=list)
+    skipped: dict[str, str] = field(default_factory=dict)  # source -> why it is missing
+    timings_ms: dict[str, float] = field(default_factory=dict)
+
+    def grouped(self) -> dict[str, list[Citation]]:
+        """Citations per source, sources ordered by their best hit."""
+        groups: dict[str, list[Citation]] = {}
+        for citation in self.citations:
+            groups.setdefault(citation.source, []).append(citation)
+        return groups
+
+    def as_text(self) -> str:
+        """Compact listing for a model: one line per citation under a header per source."""
+        if not self.citations:
+            return f"No matches in the local datasets for: {self.query}"
+        blocks = []
+        for source, citations in self.grouped().items():
+            lines = [f"[{source}]"]
+            lines += [f"- {c.title} ({c.score:.2f}): {c.text}" for c in citations]
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+
+def _snippet(text: str, limit: int = SNIPPET_CHARS) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+def _normalized(index: BM25Index, query: str, hits: list[tuple[int, float]]) -> list[tuple[int, float]]:
+    reference = index.reference_score(query)
+    if reference <= 0:
+        return []
+    return [(doc_id, min(1.0, score / reference)) for doc_id, score in hits]
+
+
+# ------------------- SOURCES -------------------
+# Each source is a search(query, k) -> list[Citation] built on first use.
+
+Search = Callable[[str, int], list[Citation]]
+
+
+def _quran_source() -> Search:
+    index = load_quran_index()
+    _, bm25 = index.search_index
+
+    def search(query: str, k: int) -> list[Citation]:
+        hits = index.search(query, k)
+        if len(hits) == 1 and hits[0][1] == 1.0:  # exact "surah:ayah" reference
+            scores = [1.0]
+        else:
+            reference = bm25.reference_score(query)
+            scores = [min(1.0, score / reference) if reference > 0 else 0.0 for _, score in hits]
+        return [
+            Citation(QURAN, f"{a.surah}:{a.ayah}", f"{a.record.get('surah_name_roman')} {a.surah}:{a.ayah}", _snippet(a.text_en), score)
+            for (a, _), score in zip(hits, scores)
+        ]
+    return search
+
+
+def _tafsir_source() -> Search:
+    df = pd.read_csv(TAFSIR_CSV_PATH).fillna("")
+    rows = df.to_dict("records")
+    bm25 = BM25Index([f"{r.get('surah_name', '')} {r.get('ayah', '')} {r.get('tafsir_content', '')}" for r in rows])
+
+    def search(query: str, k: int) -> list[Citation]:
+        citations = []
+        for doc_id, score in _normalized(bm25, query, bm25.search(query, k)):
+            row = rows[doc_id]
+            title = f"{row.get('surah_name', '')} {row.get('ayah', '')}".strip()
+            if row.get("tafsir_book"):
+                title += f" — {row['tafsir_book']}"
+            citations.append(Citation(TAFSIR, str(doc_id), title, _snippet(row.get("tafsir_content", "")), score))
+        return citations
+    return search
+
+
+def _asbab_source() -> Search:
+    passages = load_passages(ASBAB_CSV_PATH)
+    bm25 = BM25Index([p.text for p in passages])
+
+    def search(query: str, k: int) -> list[Citation]:
+        citations = []
+        for doc_id, score in _normalized(bm25, query, bm25.search(query, k)):
+            p = passages[doc_id]
+            pages = f"p. {p.first_page}" if p.first_page == p.last_page else f"p. {p.first_page}-{p.last_page}"
+            verses = f" [{', '.join(p.verses)}]" if p.verses else ""
+            citations.append(Citation(ASBAB, str(p.id), f"Asbab al-Nuzul {pages}{verses}", _snippet(p.text), score))
+        return citations
+    return search
+
+
+def _duas_source() -> Search:
+    df = pd.read_csv(DUAS_CSV_PATH)
+    rows = df.to_dict("records")
+    bm25 = BM25Index((df["Context"].astype(str) + " " + df["Translation"].astype(str)).tolist())
+
+    def search(query: str, k: int) -> list[Citation]:
+        return [
+            Citation(
+                DUAS, str(rows[doc_id]["ID"]),
+                f"{str(rows[doc_id]['Context']).title()} — {rows[doc_id]['Reference/Source']}",
+                _snippet(f"{rows[doc_id]['Arabic_Text']} — {rows[doc_id]['Translation']}"), score,
+            )
+            for doc_id, score in _normalized(bm25, query, bm25.search(query, k))
+        ]
+    return search
+
+
+_FACTORIES: dict[str, Callable[[], Search]] = {
+    QURAN: _quran_source,
+    ASBAB: _asbab_source,
+    DUAS: _duas_source,
+}
+# The tafsir dataset isn't shipped with every deployment; without it the
+# source isn't offered at all rather than reported missing on every query
+if os.path.exists(TAFSIR_CSV_PATH):
+    _FACTORIES[TAFSIR] = _tafsir_source
+SOURCES = tuple(_FACTORIES)
+
+
+@lru_cache(maxsize=None)
+def source(name: str) -> Search | None:
+    """The search of source `name`, or None when its dataset is unavailable."""
+    try:
+        return _FACTORIES[name]()
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        logger.warning(f"search source '{name}' unavailable: {e}")
+        return None
+
+
+def warm() -> None:
+    """Builds every source's index (serve.py preloads this before forking)."""
+    for name in SOURCES:
+        source(name)
+
+
+# ------------------- FEDERATED SEARCH -------------------
+
+async def _search_one(name: str, query: str, k: int, results: SearchResults) -> list[Citation]:
+    started = time.perf_counter()
+    try:
+        async with asyncio.timeout(SOURCE_TIMEOUT_S):
+            # Indexes are built on first use and scoring is pure Python, so both
+            # run off the event loop
+            search = await asyncio.to_thread(source, name)
+            if search is None:
+                results.skipped[name] = "unavailable"
+                return []
+            return await asyncio.to_thread(search, query, k)
+    except TimeoutError:
+        results.skipped[name] = "timeout"
+        return []
+    finally:
+        results.timings_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def federated_search(
+    query: str,
+    sources: tuple[str, ...] | list[str] = SOURCES,
+    limit: int = 8,
+    per_source: int = 4,
+    min_score: float = MIN_SCORE,
+) -> SearchResults:
+    """Searches `sources` concurrently and merges their hits by normalized score."""
+    results = SearchResults(query)
+    names = [name for name in dict.fromkeys(sources) if name in _FACTORIES]
+    found = await asyncio.gather(*(_search_one(name, query, per_source, results) for name in names))
+    # Long passages repeat terms and saturate sooner, so every source that has
+    # a real match keeps its best hit; the remaining slots go by score
+    ranked = [[c for c in citations if c.score >= min_score] for citations in found]
+    leaders = [citations[0] for citations in ranked if citations][:limit]
+    rest = sorted((c for citations in ranked for c in citations[1:]), key=lambda c: -c.score)
+    results.citations = sorted(leaders + rest[:limit - len(leaders)], key=lambda c: -c.score)
+    return results
+
+
+@function_tool
+async def search_sources(
+    query: str,
+    sources: list[Literal["quran", "tafsir", "asbab", "duas"]] | None = None,
+    limit: int = 8,
+) -> str:
+    """Searches the local Quran, tafsir, Asbab al-Nuzul (reasons of revelation) and duas datasets at once.
+
+    Args:
+        query: Topic, keywords, Arabic text or a "surah:ayah" reference.
+        sources: Datasets to search; all of them when omitted. Tafsir is only searched where installed.
+        limit: Maximum number of citations to return.
+    """
+    results = await federated_search(query, sources or SOURCES, limit=max(1, min(limit, 20)))
+    logger.debug("federated search", extra={"fields": {
+        "hits": len(results.citations), "skipped": results.skipped, "timings_ms": results.timings_ms,
+    }})
+    return results.as_text()
@@ -0,0 +1,147 @@
+import importlib
+import logging
+import re
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from text_index import BM25Index
+
+logger = logging.getLogger(__name__)
+
+# Local intent classifier in front of Runner.run. Confident requests go straight
+# to the specialist agent; anything else goes to QuranTadabburAgent, whose LLM
+# handoff still covers the ambiguous cases.
+
+QURAN, STORY, TAFSIR, DUA, CONTEXT = "quran", "story", "tafsir", "dua", "context"
+
+# Minimum confidence to skip the main agent's routing turn
+ROUTE_THRESHOLD = 0.6
+
+PROPHETS = (
+    "adam", "nuh", "noah", "ibrahim", "abraham", "ismail", "ishaq", "yaqub", "yusuf", "joseph",
+    "musa", "moses", "harun", "dawud", "david", "sulaiman", "sulayman", "solomon", "yunus", "jonah",
+    "ayyub", "job", "isa", "jesus", "maryam", "mary", "lut", "hud", "salih", "shuaib", "zakariya",
+    "yahya", "idris", "dhul", "luqman", "qarun", "firaun", "pharaoh",
+)
+
+INTENT_RULES: dict[str, list[tuple[str, float]]] = {
+    STORY: [
+        (r"\b(story|stories|tale|narrat\w*|qissa|qisas|kahani)\b", 2.0),
+        (r"\b(prophet|nabi|people of the cave|ashab al[- ]kahf|elephant|flood|ark)\b", 0.8),
+        (rf"\b({'|'.join(PROPHETS)})\b", 0.8),
+        (r"\b(what happened to|tell me about the)\b", 0.4),
+    ],
+    TAFSIR: [
+        (r"\b(tafsir|tafseer|tafsīr|exegesis|commentary)\b", 2.5),
+        (r"\b(interpret\w*|explain\w* the meaning|deeper meaning|scholars? say)\b", 1.0),
+        (r"\b(ibn kathir|jalalayn|qurtubi|tabari|maududi)\b", 1.5),
+    ],
+    DUA: [
+        (r"\b(dua|duas|duaa|du'a|supplication\w*|dhikr|azkar|adhkar)\b", 2.5),
+        (r"\b(what (should|do) i (say|recite)|what to (say|recite)|recite (before|after|when))\b", 1.5),
+        (r"\b(before|after|when) (sleep\w*|waking|eating|entering|leaving|travel\w*)\b", 1.0),
+    ],
+    CONTEXT: [
+        (r"\b(asbab|nuzul|nuzool|shan[- ]e[- ]nuzul)\b", 2.5),
+        (r"\b(occasions? of revelation|reasons? (for|of|behind) (the )?revelation|context of revelation)\b", 2.5),
+        (r"\bwhy was .{0,40}\brevealed\b", 2.0),
+        (r"\b(revealed about|was revealed when|background of)\b", 1.2),
+    ],
+}
+_COMPILED_RULES = {
+    intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+    for intent, rules in INTENT_RULES.items()
+}
+
+# Lexical feature: how close the request is to an occasion in daily_duas.csv
+DUAS_CSV_PATH = "daily_duas.csv"
+DUA_MATCH_SCORE = 5.0
+DUA_MATCH_WEIGHT = 0.8
+
+
+@dataclass
+class Route:
+    intent: str
+    confidence: float
+    scores: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def direct(self) -> bool:
+        return self.intent != QURAN and self.confidence >= ROUTE_THRESHOLD
+
+
+def _load_dua_index() -> BM25Index | None:
+    try:
+        df = pd.read_csv(DUAS_CSV_PATH)
+    except FileNotFoundError:
+        return None
+    return BM25Index((df["Context"].astype(str) + " " + df["Translation"].astype(str)).tolist())
+
+
+_dua_index = _load_dua_index()
+
+
+def classify(text: str) -> Route:
+    """Scores each intent from keyword rules plus lexical features."""
+    scores = {intent: 0.0 for intent in INTENT_RULES}
+    for intent, rules in _COMPILED_RULES.items():
+        for pattern, weight in rules:
+            if pattern.search(text):
+                scores[intent] += weight
+
+    if _dua_index is not None:
+        hits = _dua_index.search(text, k=1)
+        if hits and hits[0][1] >= DUA_MATCH_SCORE:
+            scores[DUA] += DUA_MATCH_WEIGHT
+
+    intent, best = max(scores.items(), key=lambda item: item[1])
+    if best == 0:
+        return Route(QURAN, 0.0, scores)
+    return Route(intent, best / (sum(scores.values()) + 1.0), scores)
+
+
+# ------------------- AGENT REGISTRY -------------------
+
+# intent -> (module, attribute); modules are imported on first use because the
+# specialist agents load their datasets at import time. CONTEXT stays with the
+# main agent: contextAgent's prompt is a data-structuring task, not a user-facing one.
+SPECIALISTS = {
+    STORY: ("story_agent", "story_agent"),
+    TAFSIR: ("tf_agent", "Tafsir_Agent"),
+    DUA: ("application_agent", "ApplicationAgent"),
+}
+_agents: dict = {}
+
+
+def specialist_agent(intent: str):
+    """The agent for `intent`, or None when it has none or its module/dataset is unavailable."""
+    if intent not in SPECIALISTS:
+        return None
+    if intent not in _agents:
+        module_name, attr = SPECIALISTS[intent]
+        try:
+            specialist = getattr(importlib.import_module(module_name), attr)
+        except (ImportError, FileNotFoundError, ValueError) as e:
+            logger.warning(f"{module_name}.{attr} unavailable, routing '{intent}' to the main agent: {e}")
+            specialist = None
+        if specialist is not None:
+            # A direct route skips the main agent, so specialists without their own
+            # checks get the main agent's input and output guardrails
+            from agent import quran_input_guardrail, quran_output_guardrail
+            specialist = specialist.clone(
+                input_guardrails=specialist.input_guardrails or [quran_input_guardrail],
+                output_guardrails=specialist.output_guardrails or [quran_output_guardrail],
+            )
+        _agents[intent] = specialist
+    return _agents[intent]
+
+
+def route(query: str, main_agent):
+    """Returns (agent, Route) for the latest user message."""
+    decision = classify(query)
+    if decision.direct:
+        target = specialist_agent(decision.intent)
+        if target is not None:
+            return target, decision
+    return main_agent, decision
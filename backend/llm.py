@@ -0,0 +1,52 @@
+from agents import AsyncOpenAI, OpenAIChatCompletionsModel, RunConfig
+from dotenv import load_dotenv
+from resilience import ResilientModel, Upstream
+import os
+
+load_dotenv()
+
+# Shared model client for every agent. FIREWORKS_BASE_URL can point the whole
+# app at another OpenAI-compatible endpoint (e.g. benchmarks/stand_in_server.py).
+FIREWORKS_API_KEY = os.getenv("FIREWORKS_API_KEY")
+FIREWORKS_BASE_URL = os.getenv("FIREWORKS_BASE_URL", "https://api.fireworks.ai/inference/v1")
+MODEL_NAME = "accounts/fireworks/models/gpt-oss-20b"
+
+# Retries and timeouts are owned by the resilience layer, not the HTTP client
+upstream = Upstream()
+
+external_client = AsyncOpenAI(
+    api_key=FIREWORKS_API_KEY,
+    base_url=FIREWORKS_BASE_URL,
+    max_retries=0,
+    timeout=upstream.settings.attempt_timeout_s
+)
+
+model = ResilientModel(
+    OpenAIChatCompletionsModel(
+        model=MODEL_NAME,
+        openai_client=external_client
+    ),
+    upstream
+)
+
+# RunConfig.model overrides the model of every agent in runs started with this
+# config (the chat agents and their handoffs), so those all use MODEL_NAME. The
+# guardrail verdict and fallback agents run without it, which lets their
+# model_profiles.json models and settings apply.
+config = RunConfig(
+    model=model,
+    model_provider=external_client,
+    tracing_disabled=True
+)
+
+_models = {MODEL_NAME: model}
+
+
+def model_for(name: str) -> ResilientModel:
+    """Model for `name` on the shared client and circuit breaker."""
+    if name not in _models:
+        _models[name] = ResilientModel(
+            OpenAIChatCompletionsModel(model=name, openai_client=external_client),
+            upstream
+        )
+    return _models[name]
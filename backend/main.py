@@ -85,10 +85,11 @@
 
 import os
 import json
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List
@@ -96,14 +97,36 @@ from typing import List
 from agents import Runner
 from agents import InputGuardrailTripwireTriggered, OutputGuardrailTripwireTriggered
 import agent as agent_module
+from run_context import TadabburContext, guardrail_stats, latest_user_message
+from speculative import run_agent
+from coalesce import chat_flights, coalesce_key
+from fallback_replies import OFF_TOPIC, QURAN_SCOPE, fallback_reply, fallback_stats
+import intent_router
+from resilience import UpstreamUnavailable
+from llm import upstream
+from degraded import CIRCUIT_OPEN, DEADLINE, UNAVAILABLE, Deadline, degraded_answer
+import ws_lifecycle
+from ws_lifecycle import ConnectionClosed
+import quran_api
+import daily_content
+from structured_logging import bind_request_id, new_request_id, request_id_var, setup_logging
 import logging
 
-logging.basicConfig(level=logging.INFO)
+# Queue-based, size-capped logging; verbose fields only for sampled requests
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # ------------------- APP CONFIG -------------------
 
-app = FastAPI(title="Tadabbur Agent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Verse / dua / reflection of the day, refreshed in the background
+    daily_content.job.start()
+    yield
+    await daily_content.job.stop()
+
+
+app = FastAPI(title="Tadabbur Agent API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -113,6 +136,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tags every log line of a request with its id (client-supplied or new)."""
+    token = bind_request_id(request.headers.get("x-request-id"))
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id_var.get()
+        return response
+    finally:
+        request_id_var.reset(token)
+
+# Read-only Quran data (/api/surah, /api/ayah, /api/juz, /api/search)
+app.include_router(quran_api.router)
+# Content of the day (/api/daily)
+app.include_router(daily_content.router)
+
 API_KEY = os.getenv("CHAT_API_KEY")
 
 
@@ -126,6 +165,24 @@ class ChatRequest(BaseModel):
     messages: List[Message]
 
 
+def tripwire_message(e, default: str | None) -> str | None:
+    """The reply a guardrail left in its output (`GuardrailFunctionOutput.output_info`)."""
+    info = getattr(getattr(e.guardrail_result, "output", None), "output_info", None)
+    return info if isinstance(info, str) and info else default
+
+
+async def run_chat(target, conversation: str, query: str):
+    """One agent run for a chat request; shared by identical requests in flight."""
+    run_context = TadabburContext(query=query)
+    result = await run_agent(
+        target,
+        conversation,
+        run_config=getattr(agent_module, "config", None),
+        context=run_context
+    )
+    return result, run_context
+
+
 @app.post("/api/chat")
 async def chat(req: ChatRequest, authorization: str | None = Header(None)):
     # """Fallback HTTP chat route (non-WebSocket)."""
@@ -133,21 +190,37 @@ async def chat(req: ChatRequest, authorization: str | None = Header(None)):
     #     if authorization is None or authorization != f"Bearer {API_KEY}":
     #         raise HTTPException(status_code=401, detail="Unauthorized")
 
+    deadline = Deadline()
     conversation = "\n".join([f"{m.role}: {m.content}" for m in req.messages])
+    query = latest_user_message(req.messages)
+    target, route = intent_router.route(query, agent_module.agent)
     try:
-        logger.info("hey")
-        result = await Runner.run(
-            agent_module.agent,
-            conversation,
-            run_config=getattr(agent_module, "config", None)
-        )
+        logger.info("chat request", extra={
+            "fields": {"intent": route.intent, "confidence": round(route.confidence, 2), "agent": target.name, "turns": len(req.messages)},
+            "verbose": {"query": query},
+        })
+        if upstream.breaker.is_open:
+            # Don't queue behind a provider that is known to be down
+            return degraded_answer(query, route, CIRCUIT_OPEN).http_payload()
+        key = coalesce_key(conversation, target.name)
+        async with deadline.timeout():
+            (result, run_context), coalesced = await chat_flights.run(
+                key, lambda: run_chat(target, conversation, query)
+            )
 
         reply_text = getattr(result, "final_output", None) or getattr(result, "output_text", None) or str(result)
+        logger.info("chat reply", extra={
+            "fields": {
+                "agent": result.last_agent.name, "handoff": result.last_agent.name != target.name,
+                "coalesced": coalesced, "reply_chars": len(reply_text),
+                "guardrail_checks": run_context.guardrail_checks, "guardrail_checks_reused": run_context.guardrail_checks_reused,
+            },
+            "verbose": {"reply": reply_text},
+        })
         return {"reply": reply_text}
 
     except InputGuardrailTripwireTriggered as e:
-        msg = getattr(e.guardrail_result, "output_info",
-                      "Sorry, your question seems unrelated to the Quranic context.")
+        msg = tripwire_message(e, "Sorry, your question seems unrelated to the Quranic context.")
         return {"reply": msg}
     # except InputGuardrailTripwireTriggered as e:
     #     # Use fallback output generated inside the guardrail
@@ -163,10 +236,18 @@ async def chat(req: ChatRequest, authorization: str | None = Header(None)):
     #     return {"reply": msg}
 
     except OutputGuardrailTripwireTriggered as e:
-        msg = getattr(e.guardrail_result, "output_info",
-                      "Sorry, I can only respond within Quranic context.")
+        msg = tripwire_message(e, "Sorry, I can only respond within Quranic context.")
         return {"reply": msg}
 
+    except TimeoutError:
+        logger.warning("chat deadline reached, answering locally")
+        return degraded_answer(query, route, DEADLINE).http_payload()
+
+    except UpstreamUnavailable as e:
+        # Model provider timed out, is failing or the circuit is open
+        logger.warning(f"model unavailable: {e}")
+        return degraded_answer(query, route, CIRCUIT_OPEN if upstream.breaker.is_open else UNAVAILABLE).http_payload()
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -177,8 +258,18 @@ async def chat(req: ChatRequest, authorization: str | None = Header(None)):
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
     """Handles Quran AI chat via WebSocket."""
+    connection_id = new_request_id()
+    bind_request_id(connection_id)
+    try:
+        conn = ws_lifecycle.registry.open(connection_id, websocket)
+    except ConnectionClosed as e:
+        # Closing before accept rejects the handshake
+        logger.warning(f"websocket rejected: {e.reason}")
+        await websocket.close(code=e.code, reason=e.reason)
+        return
     await websocket.accept()
-    logger.info("Connected to websocket successfully!")
+    logger.info("websocket connected")
+    close_reason = "client"
     try:
         # # Expect the first message to contain API key
         # init_msg = await websocket.receive_text()
@@ -202,7 +293,7 @@ async def websocket_chat(websocket: WebSocket):
 
         # Main message loop
         while True:
-            raw_data = await websocket.receive_text()
+            raw_data = await ws_lifecycle.registry.receive(websocket, conn)
             data = json.loads(raw_data)
             
             messages = data.get("messages", [])
@@ -211,19 +302,40 @@ async def websocket_chat(websocket: WebSocket):
                 [f"{m['role']}: {m['content']}" for m in messages]
             )
 
-            logger.info(f"conversation: {conversation}")
+            conn.begin_turn(raw_data)
+            deadline = Deadline()
+            request_id_var.set(f"{connection_id}.{conn.turns}")
+            query = latest_user_message(messages)
+            target, route = intent_router.route(query, agent_module.agent)
+            logger.info("chat turn", extra={
+                "fields": {
+                    "intent": route.intent, "confidence": round(route.confidence, 2), "agent": target.name,
+                    "turns": len(messages), "conversation_chars": len(conversation),
+                },
+                "verbose": {"query": query, "conversation": conversation},
+            })
+
+            if upstream.breaker.is_open:
+                await websocket.send_json(degraded_answer(query, route, CIRCUIT_OPEN).ws_payload())
+                continue
 
             try:
-                result =await Runner.run(
-                    agent_module.agent,
-                    conversation,
-                    run_config=getattr(agent_module, "config", None)
-                )
+                key = coalesce_key(conversation, target.name)
+                async with deadline.timeout():
+                    (result, run_context), coalesced = await chat_flights.run(
+                        key, lambda: run_chat(target, conversation, query)
+                    )
 
-                logger.info(f"result: {result}")
                 reply_text = getattr(result, "final_output", None) or getattr(result, "output_text", None) or str(result)
 
-                logger.info(f"reply_text: {reply_text}")
+                logger.info("chat reply", extra={
+                    "fields": {
+                        "agent": result.last_agent.name, "handoff": result.last_agent.name != target.name,
+                        "coalesced": coalesced, "reply_chars": len(reply_text), "guardrail_checks": run_context.guardrail_checks,
+                        "guardrail_checks_reused": run_context.guardrail_checks_reused,
+                    },
+                    "verbose": {"reply": reply_text, "result": result},
+                })
                 await websocket.send_json({
                     "type": "assistance_response",
                     "content": reply_text
@@ -231,15 +343,12 @@ async def websocket_chat(websocket: WebSocket):
 
             except InputGuardrailTripwireTriggered as e:
                 # Use the fallback agent's response if it exists
-                msg = getattr(e.guardrail_result, "output_info", None)
+                msg = tripwire_message(e, None)
                 if not msg:
                     # If guardrail didn’t produce fallback
-                    fallback_result = await Runner.run(
-                        agent_module.fallback_agent,
-                        conversation,
-                        run_config=getattr(agent_module, "config", None)
-                    )
-                    msg = getattr(fallback_result, "final_output", "Sorry, I can only respond within Quranic context.")
+                    msg = await fallback_reply(
+                        OFF_TOPIC, query, QURAN_SCOPE, agent_module.fallback_agent, conversation
+                    ) or "Sorry, I can only respond within Quranic context."
                 
                 await websocket.send_json({
                     "type": "assistance_response",
@@ -247,17 +356,23 @@ async def websocket_chat(websocket: WebSocket):
                 })
 
             except OutputGuardrailTripwireTriggered as e:
-                msg = getattr(e.guardrail_result, "output_info",
-                              "Sorry, I can only respond within Quranic context.")
+                msg = tripwire_message(e, "Sorry, I can only respond within Quranic context.")
                 await websocket.send_json({
                     "type": "assistance_response",
                     "content": msg
                 })
 
+            except TimeoutError:
+                logger.warning("chat deadline reached, answering locally")
+                await websocket.send_json(degraded_answer(query, route, DEADLINE).ws_payload())
+
+            except UpstreamUnavailable as e:
+                logger.warning(f"model unavailable: {e}")
+                reason = CIRCUIT_OPEN if upstream.breaker.is_open else UNAVAILABLE
+                await websocket.send_json(degraded_answer(query, route, reason).ws_payload())
+
             except Exception as e:
-                logger.info(f"⚠️ WebSocket internal error: {e}")
-                import traceback
-                traceback.print_exc()  # 👈 will show full stack trace in terminal
+                logger.exception(f"⚠️ WebSocket internal error: {e}")
                 await websocket.send_json({
                     "type": "error",
                     "content": str(e)
@@ -270,16 +385,40 @@ async def websocket_chat(websocket: WebSocket):
     except WebSocketDisconnect:
         logger.info("🔌 Client disconnected")
 
+    except ConnectionClosed as e:
+        close_reason = e.reason
+        logger.info(f"closing websocket: {e.reason}")
+        try:
+            await websocket.close(code=e.code, reason=e.reason)
+        except Exception:
+            pass
+
     except Exception as e:
-        logger.info(f"⚠️ WebSocket error: {e}")
+        close_reason = "error"
+        logger.warning(f"⚠️ WebSocket error: {e}")
         try:
             await websocket.close()
         except:
             pass
 
+    finally:
+        ws_lifecycle.registry.close(conn, close_reason)
+
+
+@app.get("/api/chat/stats")
+async def chat_stats():
+    """Single-flight counters, how tripwire replies were produced and guardrail checks run or reused."""
+    return {**chat_flights.stats(), "fallbacks": fallback_stats(), "guardrails": guardrail_stats()}
+
+
+@app.get("/api/ws/stats")
+async def websocket_stats():
+    """Gauges for the chat sockets of this worker (open / idle / busy, memory, limits)."""
+    return ws_lifecycle.registry.gauges()
+
 
 # ------------------- APP RUNNER -------------------
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, log_config=None, **ws_lifecycle.uvicorn_ws_options())
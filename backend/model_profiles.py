@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Literal
+
+from agents import Agent, ModelBehaviorError, ModelSettings, Runner
+from openai.types.shared import Reasoning
+from pydantic import BaseModel, create_model
+
+import llm
+
+logger = logging.getLogger(__name__)
+
+# Per-agent model profiles (model, output cap, temperature, output mode) loaded
+# from model_profiles.json and assigned to agents by name. Verdict agents only
+# need one word, so they get low reasoning effort and a constrained output
+# type. Their max_tokens also covers the reasoning tokens of gpt-oss, so it
+# is sized for a short chain of thought plus the verdict, not for the verdict
+# alone; a run cut off by the cap ends in ModelBehaviorError (see run_verdict).
+
+MODEL_PROFILES_PATH = os.getenv("MODEL_PROFILES_PATH", "model_profiles.json")
+# MODEL_PROFILES=off leaves every agent on its own settings (for before/after comparisons)
+PROFILES_ENABLED = os.getenv("MODEL_PROFILES", "on") != "off"
+
+TEXT, VERDICT, SCHEMA = "text", "verdict", "schema"
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    name: str
+    model: str = llm.MODEL_NAME
+    max_tokens: int | None = None
+    temperature: float | None = None
+    reasoning_effort: str | None = None
+    output: str = TEXT  # text | verdict (one of the agent's labels) | schema (agent's own output_type)
+
+    def model_settings(self, base: ModelSettings) -> ModelSettings:
+        return base.resolve(ModelSettings(
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            reasoning=Reasoning(effort=self.reasoning_effort) if self.reasoning_effort else None,
+        ))
+
+
+@lru_cache(maxsize=1)
+def load_profiles(path: str = MODEL_PROFILES_PATH) -> tuple[dict[str, ModelProfile], dict[str, dict]]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    profiles = {name: ModelProfile(name=name, **spec) for name, spec in raw["profiles"].items()}
+    for agent_name, assignment in raw["agents"].items():
+        if assignment["profile"] not in profiles:
+            raise ValueError(f"Agent {agent_name!r} uses unknown model profile {assignment['profile']!r}")
+    return profiles, raw["agents"]
+
+
+@lru_cache(maxsize=None)
+def verdict_type(labels: tuple[str, ...]) -> type[BaseModel]:
+    """Structured output that can only hold one of `labels`."""
+    return create_model("Verdict", verdict=(Literal[labels], ...))
+
+
+def verdict_text(output) -> str:
+    """Lower-cased verdict from either a plain-text or a structured verdict output."""
+    return str(getattr(output, "verdict", output)).strip().lower()
+
+
+async def run_verdict(agent: Agent, input, default: str, context=None) -> str:
+    """`verdict_text` of one run of a verdict agent.
+
+    When the model's answer can't be parsed (e.g. it was cut off by
+    max_tokens), returns `default`, so each guardrail decides whether it
+    fails open or closed.
+    """
+    try:
+        result = await Runner.run(agent, input, context=context)
+    except ModelBehaviorError as e:
+        logger.warning(f"{agent.name} gave no usable verdict, using {default!r}: {e}")
+        return default
+    return verdict_text(result.final_output)
+
+
+def apply_profiles(*agents: Agent) -> None:
+    """Applies the configured profile (if any) to each agent, in place."""
+    if not PROFILES_ENABLED:
+        return
+    profiles, assignments = load_profiles()
+    for agent in agents:
+        assignment = assignments.get(agent.name)
+        if assignment is None:
+            continue
+        profile = profiles[assignment["profile"]]
+        agent.model = llm.model_for(profile.model)
+        agent.model_settings = profile.model_settings(agent.model_settings)
+        if profile.output == VERDICT:
+            agent.output_type = verdict_type(tuple(assignment["labels"]))
@@ -0,0 +1,142 @@
+import hashlib
+import json
+from functools import lru_cache
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+
+from quran_index import SURAH_AYAH_COUNTS, load_quran_index
+from text_index import normalize_arabic
+
+# Read-only Quran data served straight from the in-memory index; browsing and
+# reading never touch the agents or the model provider.
+
+router = APIRouter(prefix="/api", tags=["quran"])
+
+# The dataset only changes with a redeploy, so responses are safe to cache for long
+CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+SEARCH_CACHE_CONTROL = "public, max-age=3600"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 300
+MAX_SEARCH_RESULTS = 200
+
+
+@lru_cache(maxsize=None)
+def ayah_json(number: int) -> bytes:
+    """Each ayah is serialized once and reused by every response that contains it."""
+    return json.dumps(load_quran_index().by_number[number].record, ensure_ascii=False).encode("utf-8")
+
+
+def _page(numbers: list[int], page: int, page_size: int, extra: dict | None = None, scores: list[float] | None = None) -> tuple[bytes, str]:
+    total = len(numbers)
+    start = (page - 1) * page_size
+    chunk = numbers[start:start + page_size]
+    if scores is not None:
+        items = [
+            b'{"score":' + f"{score:.4f}".encode() + b',"ayah":' + ayah_json(n) + b"}"
+            for n, score in zip(chunk, scores[start:start + page_size])
+        ]
+    else:
+        items = [ayah_json(n) for n in chunk]
+    meta = {
+        **(extra or {}),
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "next_page": page + 1 if start + page_size < total else None,
+    }
+    meta_json = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    body = meta_json[:-1] + b',"data":[' + b",".join(items) + b"]}"
+    return body, '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match list (or "*") matches `etag`, weak tags included."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _respond(request: Request, rendered: tuple[bytes, str], cache_control: str = CACHE_CONTROL) -> Response:
+    body, etag = rendered
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Pages are rendered per request from the cached ayah JSON; caching whole pages
+# keyed by client input would let arbitrary page/page_size/q values fill memory.
+# Search only caches its hit list, per normalized query (a few KB each).
+
+def _surah_page(n: int, page: int, page_size: int) -> tuple[bytes, str]:
+    return _page(load_quran_index().surah_ayahs[n], page, page_size, {"surah": n})
+
+
+def _juz_page(n: int, page: int, page_size: int) -> tuple[bytes, str]:
+    return _page(load_quran_index().juz_ayahs[n], page, page_size, {"juz": n})
+
+
+@lru_cache(maxsize=4096)
+def _search_hits(q: str) -> tuple[tuple[int, float], ...]:
+    return tuple((a.number, score) for a, score in load_quran_index().search(q, k=MAX_SEARCH_RESULTS))
+
+
+def _search_page(q: str, page: int, page_size: int) -> tuple[bytes, str]:
+    hits = _search_hits(" ".join(normalize_arabic(q).lower().split()))
+    return _page([n for n, _ in hits], page, page_size, {"query": q}, scores=[s for _, s in hits])
+
+
+@lru_cache(maxsize=None)
+def _ayah(number: int) -> tuple[bytes, str]:
+    body = b'{"data":' + ayah_json(number) + b"}"
+    return body, '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+@router.get("/surah/{n}")
+async def get_surah(
+    request: Request,
+    n: int,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Ayahs of surah `n`, in order."""
+    if not 1 <= n <= len(SURAH_AYAH_COUNTS):
+        raise HTTPException(status_code=404, detail="Surah not found")
+    if n not in load_quran_index().surah_ayahs:
+        raise HTTPException(status_code=404, detail="Surah not available in the dataset yet")
+    return _respond(request, _surah_page(n, page, page_size))
+
+
+@router.get("/ayah/{n}")
+async def get_ayah(request: Request, n: int):
+    """Ayah by its number in the whole Quran (`ayah_no_quran`)."""
+    if n not in load_quran_index().by_number:
+        raise HTTPException(status_code=404, detail="Ayah not found")
+    return _respond(request, _ayah(n))
+
+
+@router.get("/juz/{n}")
+async def get_juz(
+    request: Request,
+    n: int,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Ayahs of juz `n` available in the dataset, in order."""
+    if n not in load_quran_index().juz_ayahs:
+        raise HTTPException(status_code=404, detail="Juz not found")
+    return _respond(request, _juz_page(n, page, page_size))
+
+
+@router.get("/search")
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+):
+    """Full-text search over the translation and Arabic text, or a "surah:ayah" reference."""
+    return _respond(request, _search_page(q.strip(), page, page_size), SEARCH_CACHE_CONTROL)
@@ -0,0 +1,134 @@
+import re
+from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
+
+import pandas as pd
+
+from text_index import BM25Index, normalize_arabic
+
+QURAN_CSV_PATH = "QuranDataset.csv"
+
+# Number of ayahs in each surah (1..114) of the standard Hafs numbering.
+# Lets us validate references even for surahs that are not in the dataset yet.
+SURAH_AYAH_COUNTS = (
+    7, 286, 200, 176, 120, 165, 206, 75, 129, 109, 123, 111, 43, 52, 99, 128, 111, 110, 98, 135,
+    112, 78, 118, 64, 77, 227, 93, 88, 69, 60, 34, 30, 73, 54, 45, 83, 182, 88, 75, 85,
+    54, 53, 89, 59, 37, 35, 38, 29, 18, 45, 60, 49, 62, 55, 78, 96, 29, 22, 24, 13,
+    14, 11, 11, 18, 12, 12, 30, 52, 52, 44, 28, 28, 20, 56, 40, 31, 50, 40, 46, 42,
+    29, 19, 36, 25, 22, 17, 19, 26, 30, 20, 15, 21, 11, 8, 8, 19, 5, 8, 8, 11,
+    11, 8, 3, 9, 5, 4, 7, 3, 6, 3, 5, 4, 5, 6,
+)
+
+
+def ayah_exists(surah: int, ayah: int) -> bool:
+    return 1 <= surah <= len(SURAH_AYAH_COUNTS) and 1 <= ayah <= SURAH_AYAH_COUNTS[surah - 1]
+
+
+# Columns exposed by the read-only API (list_of_words duplicates ayah_ar)
+PUBLIC_COLUMNS = (
+    "surah_no", "surah_name_en", "surah_name_ar", "surah_name_roman", "ayah_no_surah", "ayah_no_quran",
+    "ayah_ar", "ayah_en", "ruko_no", "juz_no", "manzil_no", "hizb_quarter", "total_ayah_surah",
+    "place_of_revelation", "sajah_ayah", "sajdah_no", "no_of_word_ayah",
+)
+
+_REFERENCE_QUERY_RE = re.compile(r"^\s*(\d{1,3})\s*:\s*(\d{1,3})\s*$")
+
+
+def arabic_skeleton(text: str) -> str:
+    """Normalized Arabic without alefs, so Uthmani and standard spellings compare equal
+    (ذٰلك / ذلك, ٱلكتٰب / الكتاب)."""
+    return " ".join(normalize_arabic(text).replace("\u0627", "").split())
+
+
+@dataclass(frozen=True)
+class Ayah:
+    surah: int
+    ayah: int
+    text_ar: str
+    text_en: str
+    normalized_ar: str
+    number: int = 0
+    skeleton_ar: str = ""  # normalized_ar without alefs, see `arabic_skeleton`
+    record: dict = field(default_factory=dict, compare=False, hash=False)
+
+
+def _public_value(value):
+    if pd.isna(value):
+        return None
+    if hasattr(value, "item"):  # numpy scalar -> python
+        return value.item()
+    return value
+
+
+class QuranIndex:
+    """In-memory lookup structures over `QuranDataset.csv`."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.ayahs: dict[tuple[int, int], Ayah] = {}
+        self.by_number: dict[int, Ayah] = {}
+        for row in df.sort_values("ayah_no_quran").to_dict("records"):
+            key = (int(row["surah_no"]), int(row["ayah_no_surah"]))
+            ayah = Ayah(
+                surah=key[0],
+                ayah=key[1],
+                text_ar=str(row["ayah_ar"]),
+                text_en=str(row["ayah_en"]),
+                normalized_ar=" ".join(normalize_arabic(str(row["ayah_ar"])).split()),
+                number=int(row["ayah_no_quran"]),
+                skeleton_ar=arabic_skeleton(str(row["ayah_ar"])),
+                record={col: _public_value(row[col]) for col in PUBLIC_COLUMNS if col in row},
+            )
+            self.ayahs[key] = ayah
+            self.by_number[ayah.number] = ayah
+        self.surahs = frozenset(surah for surah, _ in self.ayahs)
+        # Ayah numbers (in order) per surah and per juz
+        self.surah_ayahs: dict[int, list[int]] = {}
+        self.juz_ayahs: dict[int, list[int]] = {}
+        for ayah in self.by_number.values():
+            self.surah_ayahs.setdefault(ayah.surah, []).append(ayah.number)
+            self.juz_ayahs.setdefault(int(ayah.record["juz_no"]), []).append(ayah.number)
+
+    @classmethod
+    def from_csv(cls, path: str = QURAN_CSV_PATH) -> "QuranIndex":
+        return cls(pd.read_csv(path, encoding="utf-8-sig"))
+
+    def covers(self, surah: int) -> bool:
+        """Whether the dataset holds the text of this surah."""
+        return surah in self.surahs
+
+    def get(self, surah: int, ayah: int) -> Ayah | None:
+        return self.ayahs.get((surah, ayah))
+
+    @cached_property
+    def search_index(self) -> tuple[list[int], BM25Index]:
+        numbers = list(self.by_number)
+        docs = [
+            f"{a.text_en} {a.normalized_ar} {a.record.get('surah_name_en', '')} {a.record.get('surah_name_roman', '')}"
+            for a in self.by_number.values()
+        ]
+        return numbers, BM25Index(docs)
+
+    def search(self, query: str, k: int = 20) -> list[tuple[Ayah, float]]:
+        """Ayahs matching a free-text query (English or Arabic) or a "surah:ayah" reference."""
+        ref = _REFERENCE_QUERY_RE.match(query)
+        if ref:
+            ayah = self.get(int(ref.group(1)), int(ref.group(2)))
+            return [(ayah, 1.0)] if ayah else []
+        numbers, index = self.search_index
+        return [(self.by_number[numbers[doc_id]], score) for doc_id, score in index.search(query, k)]
+
+    def find_arabic(self, text: str) -> list[tuple[int, int]]:
+        """Ayahs whose normalized Arabic contains `text` (or is contained in it)."""
+        needle = arabic_skeleton(text)
+        if not needle:
+            return []
+        return [
+            key for key, a in self.ayahs.items()
+            if needle in a.skeleton_ar or (len(a.skeleton_ar) > 20 and a.skeleton_ar in needle)
+        ]
+
+
+@lru_cache(maxsize=1)
+def load_quran_index(path: str = QURAN_CSV_PATH) -> QuranIndex:
+    return QuranIndex.from_csv(path)
@@ -0,0 +1,288 @@
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from itertools import accumulate
+
+from quran_index import SURAH_AYAH_COUNTS, QuranIndex, load_quran_index
+
+# Structural units of the mushaf (juz, hizb quarter, ruku, manzil, sajdah) as
+# contiguous ranges of `ayah_no_quran`. Each unit kind is a sorted array of
+# start numbers, so "which unit holds ayah n" and "which ayahs are in unit k"
+# are one binary search each.
+
+JUZ, HIZB_QUARTER, RUKU, MANZIL = "juz", "hizb_quarter", "ruku", "manzil"
+
+UNIT_COLUMNS = {JUZ: "juz_no", HIZB_QUARTER: "hizb_quarter", RUKU: "ruko_no", MANZIL: "manzil_no"}
+UNIT_LABELS = {JUZ: "Juz", HIZB_QUARTER: "Hizb quarter", RUKU: "Ruku", MANZIL: "Manzil"}
+
+TOTAL_AYAHS = sum(SURAH_AYAH_COUNTS)
+# SURAH_OFFSETS[s - 1] = number of ayahs before surah s
+SURAH_OFFSETS = (0, *accumulate(SURAH_AYAH_COUNTS))[:-1]
+
+# Unit starts (surah, ayah) of the standard Hafs mushaf, so juz, manzil and
+# sajdah queries are answered for the whole Quran even where the dataset has
+# no text yet. Hizb quarters and rukus come from the dataset only, so the last
+# one it starts may run on past its end: that range is marked open.
+CANONICAL_STARTS = {
+    JUZ: (
+        (1, 1), (2, 142), (2, 253), (3, 93), (4, 24), (4, 148), (5, 82), (6, 111), (7, 88), (8, 41),
+        (9, 93), (11, 6), (12, 53), (15, 1), (17, 1), (18, 75), (21, 1), (23, 1), (25, 21), (27, 56),
+        (29, 46), (33, 31), (36, 28), (39, 32), (41, 47), (46, 1), (51, 31), (58, 1), (67, 1), (78, 1),
+    ),
+    MANZIL: ((1, 1), (5, 1), (10, 1), (17, 1), (26, 1), (37, 1), (50, 1)),
+}
+SAJDAH_AYAHS = (
+    (7, 206), (13, 15), (16, 50), (17, 109), (19, 58), (22, 18), (22, 77), (25, 60),
+    (27, 26), (32, 15), (38, 24), (41, 38), (53, 62), (84, 21), (96, 19),
+)
+
+
+def ayah_number(surah: int, ayah: int) -> int:
+    """Position of surah:ayah in the whole Quran (`ayah_no_quran`)."""
+    return SURAH_OFFSETS[surah - 1] + ayah
+
+
+def surah_ayah(number: int) -> tuple[int, int]:
+    """Inverse of `ayah_number`."""
+    surah = bisect_right(SURAH_OFFSETS, number - 1)
+    return surah, number - SURAH_OFFSETS[surah - 1]
+
+
+@dataclass(frozen=True)
+class AyahRange:
+    kind: str
+    unit: int
+    start: int  # ayah_no_quran, inclusive
+    end: int
+    text_available: int = 0  # how many ayahs of the range the dataset holds
+    open: bool = False  # the unit continues past `end`, where the dataset stops
+    surah: int = 0  # set when `unit` is counted within this surah rather than across the mushaf
+    nth: int = 0  # the unit's number within `surah`
+
+    @property
+    def reference(self) -> str:
+        (s1, a1), (s2, a2) = surah_ayah(self.start), surah_ayah(self.end)
+        if s1 == s2:
+            return f"{s1}:{a1}" if a1 == a2 else f"{s1}:{a1}-{a2}"
+        return f"{s1}:{a1}-{s2}:{a2}"
+
+    @property
+    def label(self) -> str:
+        name = UNIT_LABELS.get(self.kind, self.kind.title())
+        if self.surah:
+            return f"{name} {self.nth} of surah {self.surah} ({name.lower()} {self.unit} overall)"
+        return f"{name} {self.unit}"
+
+    def describe(self) -> str:
+        if self.open:
+            (s1, a1), (s2, a2) = surah_ayah(self.start), surah_ayah(self.end)
+            return (
+                f"{self.label}: starts at {s1}:{a1} (ayah_no_quran {self.start}) and continues past {s2}:{a2}, "
+                "where the dataset stops; its end is not known"
+            )
+        size = self.end - self.start + 1
+        if self.text_available == size:
+            coverage = "text in dataset"
+        elif self.text_available:
+            coverage = f"text in dataset for {self.text_available} of {size} ayahs"
+        else:
+            coverage = "text not in dataset"
+        return f"{self.label}: {self.reference} (ayah_no_quran {self.start}-{self.end}, {size} ayah{'s' if size > 1 else ''}; {coverage})"
+
+
+class UnitTable:
+    """Sorted unit starts of one kind; unit i spans starts[i] .. starts[i + 1] - 1."""
+
+    def __init__(self, kind: str, starts: dict[int, int], last: int):
+        self.kind = kind
+        ordered = sorted(starts.items(), key=lambda item: item[1])
+        self.units = [unit for unit, _ in ordered]
+        self.starts = [start for _, start in ordered]
+        self.position = {unit: i for i, unit in enumerate(self.units)}
+        self.last = last  # last ayah the table is known to cover
+        # Past `last` the final unit's end is unknown unless the table reaches the end of the Quran
+        self.complete = last == TOTAL_AYAHS
+
+    def containing(self, number: int) -> int | None:
+        i = bisect_right(self.starts, number) - 1
+        if i < 0 or number > self.last:
+            return None
+        return self.units[i]
+
+    def span(self, unit: int) -> tuple[int, int, bool] | None:
+        """(start, end, open) of `unit`; open when it may continue past `last`."""
+        i = self.position.get(unit)
+        if i is None:
+            return None
+        if i + 1 < len(self.starts):
+            return self.starts[i], self.starts[i + 1] - 1, False
+        return self.starts[i], self.last, not self.complete
+
+
+class StructureIndex:
+    def __init__(self, quran: QuranIndex):
+        self.quran = quran
+        self.available = sorted(quran.by_number)
+        last_in_dataset = self.available[-1] if self.available else 0
+        self.tables: dict[str, UnitTable] = {}
+        for kind, column in UNIT_COLUMNS.items():
+            starts: dict[int, int] = {}
+            for number in self.available:
+                unit = quran.by_number[number].record.get(column)
+                if unit is not None:
+                    starts.setdefault(int(unit), number)
+            last = last_in_dataset
+            if kind in CANONICAL_STARTS:
+                for unit, (surah, ayah) in enumerate(CANONICAL_STARTS[kind], start=1):
+                    starts.setdefault(unit, ayah_number(surah, ayah))
+                last = TOTAL_AYAHS
+            self.tables[kind] = UnitTable(kind, starts, last)
+
+        # Surah names the dataset knows, normalised for matching ("Al-Baqarah" -> " baqara ")
+        self.surah_keys: dict[str, int] = {}
+        for number in self.available:
+            record = quran.by_number[number].record
+            for name in (record.get("surah_name_roman"), record.get("surah_name_en")):
+                if name:
+                    self.surah_keys.setdefault(_surah_key(str(name)), int(record["surah_no"]))
+
+        sajdah = {ayah_number(s, a) for s, a in SAJDAH_AYAHS}
+        sajdah.update(n for n in self.available if quran.by_number[n].record.get("sajah_ayah") is True)
+        self.sajdah = sorted(sajdah)
+
+    def _text_available(self, start: int, end: int) -> int:
+        return bisect_right(self.available, end) - bisect_right(self.available, start - 1)
+
+    def range(self, kind: str, unit: int) -> AyahRange | None:
+        """Ayah range of e.g. ("juz", 30)."""
+        table = self.tables.get(kind)
+        span = table.span(unit) if table else None
+        if span is None:
+            return None
+        start, end, open_end = span
+        return AyahRange(kind, unit, start, end, self._text_available(start, end), open_end)
+
+    def hizb(self, hizb: int) -> AyahRange | None:
+        """A whole hizb: its four quarters."""
+        first, last = self.range(HIZB_QUARTER, 4 * hizb - 3), self.range(HIZB_QUARTER, 4 * hizb)
+        if first is None:
+            return None
+        if last is None:  # the dataset stops before the hizb's last quarter
+            end, open_end = self.tables[HIZB_QUARTER].last, True
+        else:
+            end, open_end = last.end, last.open
+        return AyahRange("hizb", hizb, first.start, end, self._text_available(first.start, end), open_end)
+
+    def ruku_of_surah(self, surah: int, nth: int) -> AyahRange | None:
+        """The `nth` ruku of `surah` (rukus are numbered per surah in the mushaf margin)."""
+        table = self.tables[RUKU]
+        first = ayah_number(surah, 1)
+        last = first + SURAH_AYAH_COUNTS[surah - 1] - 1
+        units = [unit for unit, start in zip(table.units, table.starts) if first <= start <= last]
+        if not 1 <= nth <= len(units):
+            return None
+        found = self.range(RUKU, units[nth - 1])
+        # a ruku never crosses into the next surah, so one that runs to the surah's end is complete
+        return replace(found, surah=surah, nth=nth, open=found.open and found.end < last)
+
+    def named_surah(self, query: str) -> int | None:
+        """The surah a request names ("surah 2", "Surah Al-Baqarah", "baqarah"), if any."""
+        number = _SURAH_NUMBER_RE.search(query)
+        if number and 1 <= int(number.group(1)) <= len(SURAH_AYAH_COUNTS):
+            return int(number.group(1))
+        words = _surah_key(query)
+        return next((surah for key, surah in self.surah_keys.items() if key.strip() and key in words), None)
+
+    def containing(self, kind: str, number: int) -> AyahRange | None:
+        """The unit of `kind` that holds ayah `number`."""
+        table = self.tables.get(kind)
+        unit = table.containing(number) if table else None
+        return self.range(kind, unit) if unit is not None else None
+
+    def units_of(self, number: int) -> dict[str, int]:
+        """Every unit the ayah belongs to, e.g. {"juz": 3, "ruku": 35, ...}."""
+        units = {kind: table.containing(number) for kind, table in self.tables.items()}
+        return {kind: unit for kind, unit in units.items() if unit is not None}
+
+    def sajdah_ranges(self) -> list[AyahRange]:
+        return [
+            AyahRange("sajdah", i, n, n, self._text_available(n, n))
+            for i, n in enumerate(self.sajdah, start=1)
+        ]
+
+    # ------------------- QUERIES -------------------
+
+    def resolve(self, query: str) -> list[AyahRange]:
+        """Exact ranges for the structural units a request mentions.
+
+        "Juz 30", "hizb 5", "ruku 12", "ruku 5 of surah baqarah", "manzil 3",
+        "the ruku containing 2:255" and "sajdah verses" are understood ("Surah
+        As-Sajdah" is a name, not a request for the sajdahs); anything else gives [].
+        """
+        refs = [
+            ayah_number(int(s), int(a)) for s, a in _REFERENCE_RE.findall(query)
+            if 1 <= int(s) <= len(SURAH_AYAH_COUNTS) and 1 <= int(a) <= SURAH_AYAH_COUNTS[int(s) - 1]
+        ]
+        surah = self.named_surah(query)
+        ranges: list[AyahRange] = []
+        for kind, pattern in _UNIT_PATTERNS:
+            for match in pattern.finditer(query):
+                if match.group("n") and kind == RUKU and (surah is not None or _SURAH_WORD_RE.search(query)):
+                    # "ruku 5 of surah baqarah" counts within the surah; a surah we can't place gives nothing
+                    found = self.ruku_of_surah(surah, int(match.group("n"))) if surah is not None else None
+                    ranges.extend([found] if found else [])
+                elif match.group("n"):
+                    found = self.hizb(int(match.group("n"))) if kind == "hizb" else self.range(kind, int(match.group("n")))
+                    ranges.extend([found] if found else [])
+                else:
+                    for number in refs:
+                        found = self.containing(HIZB_QUARTER if kind == "hizb" else kind, number)
+                        ranges.extend([found] if found else [])
+        if _asks_for_sajdahs(query):
+            ranges.extend(self.sajdah_ranges())
+        return list(dict.fromkeys(ranges))
+
+    def notes(self, query: str) -> str:
+        """Prompt lines with the exact ranges a request refers to ("" if none)."""
+        ranges = self.resolve(query)
+        if not ranges:
+            return ""
+        return "Exact verse ranges for this request (use these boundaries, do not estimate them):\n" + "\n".join(
+            f"- {r.describe()}" for r in ranges
+        )
+
+
+_REFERENCE_RE = re.compile(r"\b(\d{1,3})\s*:\s*(\d{1,3})\b")
+# The number is optional ("the ruku containing 2:255") and never the surah of a reference
+_NUMBER = r"(?:\s+(?:no\.?|number|#))?\s*(?P<n>\d{1,3}(?!\s*:\s*\d))?\b"
+_UNIT_PATTERNS = [
+    (JUZ, re.compile(r"\b(?:juz'|juzz|juz|parah|para|sipara)" + _NUMBER, re.IGNORECASE)),
+    (HIZB_QUARTER, re.compile(r"\b(?:hizb quarter|rub(?: al)?[- ]hizb|rub')" + _NUMBER, re.IGNORECASE)),
+    ("hizb", re.compile(r"(?<!al[- ])\bhizb(?! quarter)" + _NUMBER, re.IGNORECASE)),
+    (RUKU, re.compile(r"\b(?:ruku'|rukuh|ruku|rukoo|ruko)" + _NUMBER, re.IGNORECASE)),
+    (MANZIL, re.compile(r"\b(?:manzil|manazil)" + _NUMBER, re.IGNORECASE)),
+]
+_SAJDAH_RE = re.compile(r"\b(sajdah?|sajdas|sujud al[- ]tilawa\w*|prostration verses?|verses? of prostration)\b", re.IGNORECASE)
+# "Surah As-Sajdah", "al-sajdah", "surah sajda": the surah's name, not its prostration verses
+_SAJDAH_SURAH_PREFIX_RE = re.compile(r"(?:\b(?:surah?|sura)\s+|\b(?:as|al)[- ]?)$", re.IGNORECASE)
+_SURAH_WORD_RE = re.compile(r"\b(?:surah?|sura)\b", re.IGNORECASE)
+_SURAH_NUMBER_RE = re.compile(r"\b(?:surah?|sura)\s*(?:no\.?|number|#)?\s*(\d{1,3})\b(?!\s*:)", re.IGNORECASE)
+
+
+def _surah_key(text: str) -> str:
+    # "Al-Baqarah", "al baqara" and "baqarah" all become " baqara "
+    words = re.sub(r"\b(?:al|an|ar|as|at|ad|ash|the)[- ]", "", text.lower())
+    return " " + " ".join(word.removesuffix("h") for word in re.findall(r"[a-z]+", words)) + " "
+
+
+def _asks_for_sajdahs(query: str) -> bool:
+    return any(
+        not _SAJDAH_SURAH_PREFIX_RE.search(query, 0, match.start())
+        for match in _SAJDAH_RE.finditer(query)
+    )
+
+
+@lru_cache(maxsize=1)
+def load_structure_index() -> StructureIndex:
+    return StructureIndex(load_quran_index())
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import openai
+from agents.models.interface import Model
+
+logger = logging.getLogger(__name__)
+
+# Deadlines, retry budget, hedged requests and a circuit breaker around the
+# shared model client, so one slow or failing upstream can't stall every chat.
+
+UNAVAILABLE_MESSAGE = (
+    "Sorry, Tadabbur can't reach its knowledge service right now. "
+    "Please try again in a moment."
+)
+
+
+class UpstreamUnavailable(Exception):
+    """The model call could not be completed (deadline, exhausted retries or open circuit)."""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+@dataclass
+class ResilienceSettings:
+    deadline_s: float = float(os.getenv("MODEL_CALL_DEADLINE_S", "45"))
+    attempt_timeout_s: float = float(os.getenv("MODEL_ATTEMPT_TIMEOUT_S", "30"))
+    retry_ratio: float = float(os.getenv("MODEL_RETRY_RATIO", "0.2"))
+    min_retries_per_s: float = float(os.getenv("MODEL_MIN_RETRIES_PER_S", "0.5"))
+    hedge_percentile: float = float(os.getenv("MODEL_HEDGE_PERCENTILE", "95"))
+    hedge_min_samples: int = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+    hedge_enabled: bool = os.getenv("MODEL_HEDGE_ENABLED", "1") == "1"
+    failure_threshold: int = int(os.getenv("MODEL_BREAKER_FAILURES", "5"))
+    reset_timeout_s: float = float(os.getenv("MODEL_BREAKER_RESET_S", "30"))
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class RetryBudget:
+    """Allows retries (and hedges) up to `ratio` of recent calls, plus a small floor,
+    so a struggling provider never sees more than ~(1 + ratio)x its normal load."""
+
+    def __init__(self, ratio: float, min_per_s: float, window_s: float = 10.0):
+        self.ratio = ratio
+        self.min_per_s = min_per_s
+        self.window_s = window_s
+        self.calls: deque[float] = deque()
+        self.retries: deque[float] = deque()
+
+    def _trim(self, now: float) -> None:
+        for events in (self.calls, self.retries):
+            while events and now - events[0] > self.window_s:
+                events.popleft()
+
+    def record_call(self) -> None:
+        self.calls.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        allowed = max(self.min_per_s * self.window_s, self.ratio * len(self.calls))
+        if len(self.retries) >= allowed:
+            return False
+        self.retries.append(now)
+        return True
+
+
+class CircuitBreaker:
+    """closed -> open after `failure_threshold` consecutive failures; open -> half-open
+    after `reset_timeout_s`; one probe call then closes or re-opens it."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def before_call(self) -> None:
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout_s:
+                raise CircuitOpenError("model provider circuit is open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                raise CircuitOpenError("model provider circuit is half-open, probe in flight")
+            self.probe_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.probe_in_flight = False
+        if self.state != self.CLOSED:
+            logger.info("model circuit closed")
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"model circuit opened after {self.failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout_s
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies for the hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class Upstream:
+    """State shared by every model that talks to the same provider."""
+
+    def __init__(self, settings: ResilienceSettings | None = None):
+        self.settings = settings or ResilienceSettings()
+        self.budget = RetryBudget(self.settings.retry_ratio, self.settings.min_retries_per_s)
+        self.breaker = CircuitBreaker(self.settings.failure_threshold, self.settings.reset_timeout_s)
+        self.stats = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                      "failures": 0, "rejected_open": 0, "budget_exhausted": 0}
+
+
+class ResilientModel(Model):
+    """Wraps a `Model` with a per-call deadline, budgeted retries, hedged duplicate
+    requests after the observed latency percentile and a shared circuit breaker."""
+
+    def __init__(self, inner: Model, upstream: Upstream, latency: LatencyTracker | None = None):
+        self.inner = inner
+        self.upstream = upstream
+        # Latency is tracked per model so verdict agents and long answers hedge on their own percentile
+        self.latency = latency or LatencyTracker()
+
+    def hedge_delay(self) -> float | None:
+        settings = self.upstream.settings
+        if not settings.hedge_enabled or len(self.latency.samples) < settings.hedge_min_samples:
+            return None
+        return self.latency.percentile(settings.hedge_percentile)
+
+    async def _attempt(self, args, kwargs):
+        self.upstream.stats["attempts"] += 1
+        started = time.monotonic()
+        async with asyncio.timeout(self.upstream.settings.attempt_timeout_s):
+            response = await self.inner.get_response(*args, **kwargs)
+        self.latency.add(time.monotonic() - started)
+        return response
+
+    async def _hedged_attempt(self, args, kwargs):
+        """One logical attempt; duplicates the request if it runs past the hedge delay."""
+        delay = self.hedge_delay()
+        primary = asyncio.create_task(self._attempt(args, kwargs))
+        tasks = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.upstream.budget.try_spend():
+                    self.upstream.stats["hedges"] += 1
+                    tasks.add(asyncio.create_task(self._attempt(args, kwargs)))
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.upstream.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def get_response(self, *args, **kwargs):
+        upstream = self.upstream
+        upstream.stats["calls"] += 1
+        try:
+            upstream.breaker.before_call()
+        except CircuitOpenError:
+            upstream.stats["rejected_open"] += 1
+            raise
+        upstream.budget.record_call()
+
+        deadline = time.monotonic() + upstream.settings.deadline_s
+        attempt = 0
+        while True:
+            try:
+                async with asyncio.timeout(deadline - time.monotonic()):
+                    response = await self._hedged_attempt(args, kwargs)
+            except asyncio.CancelledError:
+                upstream.breaker.probe_in_flight = False
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The provider answered; a rejected request says nothing about its health
+                    upstream.breaker.record_success()
+                    raise
+                upstream.stats["failures"] += 1
+                upstream.breaker.record_failure()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or upstream.breaker.is_open:
+                    raise UpstreamUnavailable(f"model call failed: {e!r}") from e
+                if not upstream.budget.try_spend():
+                    upstream.stats["budget_exhausted"] += 1
+                    raise UpstreamUnavailable(f"retry budget exhausted: {e!r}") from e
+                attempt += 1
+                upstream.stats["retries"] += 1
+                await asyncio.sleep(min(remaining, random.uniform(0, 0.1 * 2 ** attempt)))
+                continue
+            upstream.breaker.record_success()
+            return response
+
+    def stream_response(self, *args, **kwargs):
+        if self.upstream.breaker.is_open:
+            raise CircuitOpenError("model provider circuit is open")
+        return self.inner.stream_response(*args, **kwargs)
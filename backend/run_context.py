@@ -0,0 +1,86 @@
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+
+# Which guardrails' verdicts each guardrail accepts for the same text within
+# one run. Only passing verdicts are reused: a tripwire ends the run anyway.
+# A Quran-relatedness pass covers the story relevance check and vice versa;
+# input and output checks never stand in for each other.
+#
+# With the SDK's current semantics the chat flows save 0 calls here: input
+# guardrails run only for the starting agent and output guardrails only for
+# the final one, so a handoff (main agent -> QuranStoryTeller) or a direct
+# specialist route never checks the same text twice. The counters below
+# (per run in the "chat reply" log, totals in /api/chat/stats) show that;
+# `guardrail_checks_reused` only moves once a path repeats a check.
+VERDICT_COMPATIBILITY: dict[str, tuple[str, ...]] = {
+    "quran_input_guardrail": ("quran_input_guardrail", "semantic_guardrail"),
+    "semantic_guardrail": ("semantic_guardrail", "quran_input_guardrail"),
+    "quran_output_guardrail": ("quran_output_guardrail", "story_output_guardrail"),
+    "story_output_guardrail": ("story_output_guardrail", "quran_output_guardrail"),
+}
+
+
+def _text_key(text) -> str:
+    """Whitespace-insensitive key for a guardrail's input (a string or input items)."""
+    return hashlib.blake2b(" ".join(str(text).split()).encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Process-wide totals of the per-run counters
+_totals: Counter[str] = Counter()
+
+
+def guardrail_stats() -> dict:
+    return {"checks": _totals["checks"], "reused": _totals["reused"]}
+
+
+@dataclass
+class TadabburContext:
+    """Per-request state passed to `Runner.run(..., context=...)` and shared by
+    every agent, guardrail and handoff of that run."""
+    query: str = ""
+    # (guardrail, text key) of checks that passed during this run
+    verdicts: set[tuple[str, str]] = field(default_factory=set)
+    guardrail_checks: int = 0
+    guardrail_checks_reused: int = 0
+
+    def reuse_verdict(self, guardrail: str, text) -> bool:
+        """True (and counted) when a compatible guardrail already passed `text`."""
+        key = _text_key(text)
+        if any((other, key) in self.verdicts for other in VERDICT_COMPATIBILITY.get(guardrail, (guardrail,))):
+            self.guardrail_checks_reused += 1
+            _totals["reused"] += 1
+            return True
+        return False
+
+    def record_verdict(self, guardrail: str, text, passed: bool) -> None:
+        self.guardrail_checks += 1
+        _totals["checks"] += 1
+        if passed:
+            self.verdicts.add((guardrail, _text_key(text)))
+
+
+def latest_user_message(messages) -> str:
+    """Content of the last user message (dicts or pydantic `Message` objects)."""
+    for m in reversed(messages):
+        role = m["role"] if isinstance(m, dict) else m.role
+        if role == "user":
+            return m["content"] if isinstance(m, dict) else m.content
+    return ""
+
+
+def query_from(ctx) -> str:
+    """Request text of a `RunContextWrapper`, or "" when no context was passed."""
+    return getattr(getattr(ctx, "context", None), "query", "") or ""
+
+
+def reused_verdict(ctx, guardrail: str, text) -> bool:
+    """`TadabburContext.reuse_verdict` for a `RunContextWrapper`; False without a context."""
+    context = getattr(ctx, "context", None)
+    return isinstance(context, TadabburContext) and context.reuse_verdict(guardrail, text)
+
+
+def record_verdict(ctx, guardrail: str, text, passed: bool) -> None:
+    context = getattr(ctx, "context", None)
+    if isinstance(context, TadabburContext):
+        context.record_verdict(guardrail, text, passed)
@@ -0,0 +1,252 @@
+"""Production launcher: preload once, then pre-fork uvicorn workers.
+
+The parent imports the app (agents, pandas DataFrames, CSV indexes, prompt
+strings), freezes those objects out of the garbage collector and forks N
+workers that share them copy-on-write and accept on one listening socket.
+
+    python serve.py --workers 4 --port 8000
+
+Signals to the parent:
+    SIGHUP   rolling restart (new worker up before the old one is stopped)
+    SIGUSR1  log the per-worker memory report
+    SIGTERM / SIGINT  graceful shutdown
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+import ws_lifecycle
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [serve:%(process)d] %(message)s")
+logger = logging.getLogger("serve")
+
+
+def preload():
+    """Imports the app and warms every lazily loaded dataset before forking."""
+    import main
+    import intent_router
+    import federated_search
+    from asbab_pipeline import load_passages
+    from quran_index import load_quran_index
+    from quran_structure import load_structure_index
+
+    load_quran_index().search_index
+    load_structure_index()
+    load_passages()
+    federated_search.warm()
+    for intent in intent_router.SPECIALISTS:
+        intent_router.specialist_agent(intent)
+    return main.app
+
+
+def memory_usage(pid: int) -> dict[str, int]:
+    """Rss / Pss / shared / private memory of a process in kB (Linux)."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        return {}
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "shared_kb": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+class Arbiter:
+    """Keeps `workers` forked uvicorn processes alive on a shared socket."""
+
+    def __init__(self, app, args):
+        self.app = app
+        self.args = args
+        self.workers: dict[int, float] = {}  # pid -> start time
+        self.retiring: set[int] = set()
+        self.stopping = False
+        self.reload_requested = False
+        self.report_requested = False
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((args.host, args.port))
+        self.sock.listen(args.backlog)
+        self.sock.set_inheritable(True)
+
+    # ------------------- WORKERS -------------------
+
+    def spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return pid
+
+        # Child: drop the parent's handlers, uvicorn installs its own
+        for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        config = uvicorn.Config(
+            self.app,
+            log_level="info",
+            log_config=None,  # keep main's queue-based logging
+            **ws_lifecycle.uvicorn_ws_options(),
+            limit_max_requests=self.args.max_requests or None,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+        )
+        try:
+            uvicorn.Server(config).run(sockets=[self.sock])
+        finally:
+            os._exit(0)
+
+    def retire(self, pid: int) -> None:
+        """Asks a worker to finish its in-flight requests and exit."""
+        if pid in self.workers and pid not in self.retiring:
+            self.retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+            if pid not in self.retiring and not self.stopping:
+                logger.info(f"worker {pid} exited ({os.waitstatus_to_exitcode(status)}), replacing it")
+            self.retiring.discard(pid)
+
+    def rolling_restart(self) -> None:
+        for pid in list(self.workers):
+            if pid in self.retiring:
+                continue
+            self.spawn()
+            time.sleep(self.args.recycle_delay)
+            self.retire(pid)
+
+    def recycle_oversized(self) -> None:
+        if not self.args.max_worker_private_mb:
+            return
+        for pid in list(self.workers):
+            private_mb = memory_usage(pid).get("private_kb", 0) / 1024
+            if pid not in self.retiring and private_mb > self.args.max_worker_private_mb:
+                logger.info(f"worker {pid} uses {private_mb:.0f} MB private memory, recycling")
+                self.spawn()
+                self.retire(pid)
+
+    # ------------------- REPORTING -------------------
+
+    def memory_report(self) -> list[dict]:
+        rows = [{"pid": os.getpid(), "role": "parent", **memory_usage(os.getpid())}]
+        now = time.monotonic()
+        for pid, started in sorted(self.workers.items()):
+            rows.append({
+                "pid": pid,
+                "role": "retiring" if pid in self.retiring else "worker",
+                "uptime_s": round(now - started),
+                **memory_usage(pid),
+            })
+        return rows
+
+    def log_memory_report(self) -> None:
+        rows = self.memory_report()
+        for row in rows:
+            logger.info(
+                f"{row['role']:<8} pid={row['pid']:<7} rss={row.get('rss_kb', 0) / 1024:7.1f}MB "
+                f"pss={row.get('pss_kb', 0) / 1024:7.1f}MB shared={row.get('shared_kb', 0) / 1024:7.1f}MB "
+                f"private={row.get('private_kb', 0) / 1024:7.1f}MB"
+            )
+        logger.info(f"total pss {sum(r.get('pss_kb', 0) for r in rows) / 1024:.1f}MB")
+
+    # ------------------- MAIN LOOP -------------------
+
+    def _on_signal(self, signum, frame) -> None:
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            self.stopping = True
+        elif signum == signal.SIGHUP:
+            self.reload_requested = True
+        elif signum == signal.SIGUSR1:
+            self.report_requested = True
+
+    def run(self) -> None:
+        for sig in (signal.SIGHUP, signal.SIGUSR1, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        logger.info(f"listening on {self.args.host}:{self.args.port} with {self.args.workers} workers")
+
+        last_report = time.monotonic()
+        while not self.stopping:
+            time.sleep(0.5)
+            self.reap()
+            if self.stopping:
+                break
+            if self.reload_requested:
+                self.reload_requested = False
+                logger.info("rolling restart")
+                self.rolling_restart()
+            while len(self.workers) - len(self.retiring) < self.args.workers:
+                self.spawn()
+            self.recycle_oversized()
+            if self.report_requested or (
+                self.args.report_interval and time.monotonic() - last_report >= self.args.report_interval
+            ):
+                self.report_requested = False
+                last_report = time.monotonic()
+                self.log_memory_report()
+
+        logger.info("shutting down workers")
+        for pid in list(self.workers):
+            self.retire(pid)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self.reap()
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGKILL)
+        self.reap()
+        self.sock.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--max-requests", type=int, default=0,
+                        help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-worker-private-mb", type=float, default=0,
+                        help="recycle a worker whose private memory exceeds this (0 = never)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds a retiring worker gets to finish in-flight requests")
+    parser.add_argument("--recycle-delay", type=float, default=1.0,
+                        help="pause between replacing workers during a rolling restart")
+    parser.add_argument("--report-interval", type=float, default=0,
+                        help="log the memory report every N seconds (0 = only on SIGUSR1)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    app = preload()
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers don't touch (and un-share) the preloaded pages.
+    gc.collect()
+    gc.freeze()
+    Arbiter(app, args).run()
+    sys.exit(0)
@@ -0,0 +1,79 @@
+"""Per-agent scheduling of input guardrails.
+
+The SDK pinned in uv.lock (openai-agents 0.4.2) has no way to choose this: its
+Runner always gathers the starting agent's input guardrails together with the
+first model turn, and a tripwire does not cancel that turn. The per-guardrail
+`input_guardrail(run_in_parallel=...)` flag that covers this arrived in a later
+release. Until the lock moves to one, `run_agent` below gives each agent its
+mode by running the guardrails itself on a guardrail-free clone of the agent.
+After the upgrade, set `run_in_parallel` on the guardrails of each agent per
+GUARDRAIL_MODES, call `Runner.run` directly and delete this module.
+"""
+import asyncio
+import os
+
+from agents import Agent, InputGuardrailTripwireTriggered, RunContextWrapper, Runner
+
+# How each starting agent schedules its input guardrails:
+#   "sequential"  - guardrails finish before the agent's first model call
+#   "speculative" - the agent starts right away while the guardrails run; if one
+#                   trips, the agent run is cancelled and its output discarded
+# Override with GUARDRAIL_MODES="QuranTadabburAgent=sequential,QuranStoryTeller=speculative".
+SEQUENTIAL = "sequential"
+SPECULATIVE = "speculative"
+
+GUARDRAIL_MODES = {
+    "QuranTadabburAgent": SPECULATIVE,
+    "QuranStoryTeller": SEQUENTIAL,
+}
+for _item in filter(None, os.getenv("GUARDRAIL_MODES", "").split(",")):
+    _name, _, _mode = _item.partition("=")
+    GUARDRAIL_MODES[_name.strip()] = _mode.strip()
+
+
+def guardrail_mode(agent: Agent) -> str:
+    mode = GUARDRAIL_MODES.get(agent.name, SEQUENTIAL)
+    if mode not in (SEQUENTIAL, SPECULATIVE):
+        raise ValueError(f"Unknown guardrail mode {mode!r} for agent {agent.name!r}")
+    return mode
+
+
+async def check_input(agent: Agent, input, context=None) -> None:
+    """Runs the agent's input guardrails concurrently; raises on the first tripwire."""
+    wrapper = RunContextWrapper(context=context)
+    tasks = [asyncio.create_task(g.run(agent, input, wrapper)) for g in agent.input_guardrails]
+    try:
+        for done in asyncio.as_completed(tasks):
+            result = await done
+            if result.output.tripwire_triggered:
+                raise InputGuardrailTripwireTriggered(result)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_agent(agent: Agent, input, *, context=None, run_config=None, mode: str | None = None):
+    """`Runner.run` with the agent's input guardrails scheduled per `GUARDRAIL_MODES`.
+
+    Raises `InputGuardrailTripwireTriggered` exactly like `Runner.run`, so callers
+    handle both modes the same way.
+    """
+    if not agent.input_guardrails:
+        return await Runner.run(agent, input, context=context, run_config=run_config)
+
+    mode = mode or guardrail_mode(agent)
+    unguarded = agent.clone(input_guardrails=[])
+
+    if mode == SEQUENTIAL:
+        await check_input(agent, input, context)
+        return await Runner.run(unguarded, input, context=context, run_config=run_config)
+
+    main_run = asyncio.create_task(Runner.run(unguarded, input, context=context, run_config=run_config))
+    try:
+        await check_input(agent, input, context)
+    except BaseException:
+        main_run.cancel()
+        await asyncio.gather(main_run, return_exceptions=True)
+        raise
+    return await main_run
@@ -1,32 +1,16 @@
 from agents import (
-    Agent, ModelSettings, OpenAIChatCompletionsModel,
-    RunConfig, Runner, GuardrailFunctionOutput,
+    Agent, ModelSettings, Runner, GuardrailFunctionOutput,
     RunContextWrapper, TResponseInputItem, input_guardrail
 )
-from openai import AsyncOpenAI
-from tf_agent import Tafsir_Agent
+from llm import external_client, model, config
+from citation_verifier import INVALID, VALID, verify_citations
+from model_profiles import apply_profiles, run_verdict
+from run_context import query_from, record_verdict, reused_verdict
+from story_exemplars import ExemplarIndex
+from federated_search import search_sources
+from fallback_replies import OFF_TOPIC, OUTPUT_DRIFT, STORY_SCOPE, fallback_reply, local_reply, mentions_off_topic
 import pandas as pd
-from dotenv import load_dotenv
 import asyncio
-import json
-import os
-
-# Load environment variables
-load_dotenv()
-FIREWORKS_API_KEY = os.getenv("FIREWORKS_API_KEY")
-
-# Initialize Fireworks client
-external_client = AsyncOpenAI(
-    api_key=FIREWORKS_API_KEY,
-    base_url="https://api.fireworks.ai/inference/v1"
-)
-
-# Define model and configuration
-model = OpenAIChatCompletionsModel(
-    model="accounts/fireworks/models/gpt-oss-20b",
-    openai_client=external_client
-)
-config = RunConfig(model=model, model_provider=external_client, tracing_disabled=True)
 
 # Load Quran dataset context
 df = pd.read_csv("QuranDataset.csv", encoding="utf-8-sig")
@@ -37,9 +21,8 @@ context = [
     "\n".join(df["surah_name_en"].astype(str)),
 ]
 
-# Load example story for narrative style
-with open("story_exmp.txt", "r", encoding="utf-8") as f:
-    story_example = json.load(f)
+# Example stories for narrative style, indexed so each request only carries the closest ones
+story_exemplars = ExemplarIndex.from_file("story_exmp.txt")
 
 # 🧠 Guardrail Agent — checks semantic relevance
 guardrail_agent = Agent(
@@ -68,14 +51,21 @@ fallback_agent = Agent(
 async def semantic_guardrail(
     ctx: RunContextWrapper[None], agent: Agent, input: str | list[TResponseInputItem]
 ) -> GuardrailFunctionOutput:
-    result = await Runner.run(guardrail_agent, input, context=ctx.context)
-    decision = str(result.final_output).strip().upper()
+    if reused_verdict(ctx, "semantic_guardrail", input):
+        return GuardrailFunctionOutput(output_info="Input already verified in this run.", tripwire_triggered=False)
+    query = query_from(ctx) or (input if isinstance(input, str) else "")
+    local = local_reply(query, STORY_SCOPE)
+    if local is not None:
+        return GuardrailFunctionOutput(output_info=local, tripwire_triggered=True)
+    # Fails open: story_output_guardrail still checks the story itself
+    decision = (await run_verdict(guardrail_agent, input, "related", context=ctx.context)).upper()
+    record_verdict(ctx, "semantic_guardrail", input, passed="UNRELATED" not in decision)
 
     if "UNRELATED" in decision:
         # Graceful fallback: no error, just redirect
-        fallback = await Runner.run(fallback_agent, input, context=ctx.context)
+        fallback = await fallback_reply(OFF_TOPIC, query, STORY_SCOPE, fallback_agent, input, context=ctx.context)
         return GuardrailFunctionOutput(
-            output_info=fallback.final_output,
+            output_info=fallback,
             tripwire_triggered=True  # tripwire signals fallback, not failure
         )
 
@@ -106,17 +96,28 @@ async def story_output_guardrail(
     output: str
 ) -> GuardrailFunctionOutput:
     """Ensure the story stays within Quranic moral context"""
-    result = await Runner.run(output_guard_agent, output, context=ctx.context)
-    verdict = str(result.final_output).strip().lower()
+    # Cheap local check of the cited verses first; the LLM verifier (which carries
+    # the whole Quran context) runs unless they check out and nothing in the
+    # story is plainly off-topic.
+    if reused_verdict(ctx, "story_output_guardrail", output):
+        return GuardrailFunctionOutput(output_info="Output already verified in this run.", tripwire_triggered=False)
+    check = verify_citations(output)
+    if check.status == INVALID:
+        verdict = INVALID  # a verse that doesn't exist, or Arabic that isn't the cited verse
+    elif check.status == VALID and not mentions_off_topic(output):
+        verdict = VALID
+    else:
+        # Fails closed: an unverified story is replaced by the fallback
+        verdict = await run_verdict(output_guard_agent, output, "invalid", context=ctx.context)
+    record_verdict(ctx, "story_output_guardrail", output, passed="invalid" not in verdict)
 
     if "invalid" in verdict:
-        fallback = await Runner.run(
-            fallback_agent,
-            "Sorry, this story seems unrelated to the Quranic teachings.",
-            context=ctx.context
+        fallback = await fallback_reply(
+            OUTPUT_DRIFT, query_from(ctx) or output, STORY_SCOPE, fallback_agent,
+            "Sorry, this story seems unrelated to the Quranic teachings.", context=ctx.context
         )
         return GuardrailFunctionOutput(
-            output_info=fallback.final_output,
+            output_info=fallback,
             tripwire_triggered=True,
         )
 
@@ -125,21 +126,29 @@ async def story_output_guardrail(
         tripwire_triggered=False
     )
 
-# 🌙 Main Quranic Storytelling Agent
-story_agent = Agent(
-    name="QuranStoryTeller",
-    instructions=(
+apply_profiles(guardrail_agent, fallback_agent, output_guard_agent)
+
+def story_instructions(ctx: RunContextWrapper, agent: Agent) -> str:
+    """Builds the prompt with only the examples closest to the current request."""
+    return (
         "You are Tadabbur, a storytelling assistant inspired by the Quran. "
         "Using the Quranic dataset context provided, craft short, emotionally engaging stories "
         "that teach moral lessons from Quranic verses. "
         "Your stories should be engaging and like this example:\n\n"
-        f"{story_example}\n\n"
+        f"{story_exemplars.render(query_from(ctx))}\n\n"
+        "Use the `search_sources` tool to ground the story in the ayahs and reasons of revelation it draws on. "
         "Always stay relevant to the Quranic moral and narrative context."
-    ),
+    )
+
+# 🌙 Main Quranic Storytelling Agent
+story_agent = Agent(
+    name="QuranStoryTeller",
+    instructions=story_instructions,
     model=model,
     model_settings=ModelSettings(temperature=0.7),
     input_guardrails=[semantic_guardrail],
     output_guardrails=[story_output_guardrail],
+    tools=[search_sources],
 )
 
 # async def main():
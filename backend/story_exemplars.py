@@ -0,0 +1,57 @@
+import json
+import os
+
+from text_index import BM25Index, estimate_tokens
+
+# Example stories used to show QuranStoryTeller the expected narrative style.
+# Only the closest one or two are sent with each request instead of the whole file.
+
+STORY_EXAMPLES_PATH = "story_exmp.txt"
+MAX_EXEMPLARS = int(os.getenv("STORY_MAX_EXEMPLARS", "2"))
+EXEMPLAR_TOKEN_BUDGET = int(os.getenv("STORY_EXEMPLAR_TOKEN_BUDGET", "900"))
+
+
+def format_exemplar(example: dict) -> str:
+    return (
+        f"Request: {example['query']}\n"
+        f"Reference: {example['reference']}\n"
+        f"Story: {example['story']}"
+    )
+
+
+class ExemplarIndex:
+    """BM25 index over each example's `query`, `reference` and `context` fields."""
+
+    def __init__(self, examples: list[dict]):
+        self.examples = examples
+        self.rendered = [format_exemplar(e) for e in examples]
+        self.costs = [estimate_tokens(text) for text in self.rendered]
+        self.index = BM25Index(
+            [f"{e.get('query', '')} {e.get('reference', '')} {e.get('context', '')}" for e in examples]
+        )
+
+    @classmethod
+    def from_file(cls, path: str = STORY_EXAMPLES_PATH) -> "ExemplarIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def select(self, query: str, k: int = MAX_EXEMPLARS, token_budget: int = EXEMPLAR_TOKEN_BUDGET) -> list[int]:
+        """Ids of the most similar examples that fit in `token_budget`.
+
+        Falls back to the cheapest example when nothing matches, so the model
+        always sees at least one sample of the style.
+        """
+        chosen, spent = [], 0
+        for doc_id, _ in self.index.search(query, k=len(self.examples)):
+            if len(chosen) == k:
+                break
+            if spent + self.costs[doc_id] <= token_budget:
+                chosen.append(doc_id)
+                spent += self.costs[doc_id]
+
+        if not chosen and self.examples:
+            chosen.append(min(range(len(self.examples)), key=self.costs.__getitem__))
+        return chosen
+
+    def render(self, query: str, **kwargs) -> str:
+        return "\n\n".join(self.rendered[i] for i in self.select(query, **kwargs))
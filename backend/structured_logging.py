@@ -0,0 +1,163 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+import uuid
+import zlib
+
+# Logging for the chat hot path: callers only cap fields and put the record on
+# a bounded queue; a listener thread formats and writes it. Every record is
+# capped in size, verbose fields (whole conversations, replies, run results)
+# are only kept for a sample of requests, and every line carries the request id.
+#
+#     logger.info("chat turn", extra={"fields": {"turns": 4}, "verbose": {"conversation": text}})
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_FIELD_MAX_CHARS = int(os.getenv("LOG_FIELD_MAX_CHARS", "300"))
+LOG_MESSAGE_MAX_CHARS = int(os.getenv("LOG_MESSAGE_MAX_CHARS", "1000"))
+LOG_TRACEBACK_MAX_CHARS = int(os.getenv("LOG_TRACEBACK_MAX_CHARS", "4000"))
+# Share of requests whose verbose fields are logged
+LOG_VERBOSE_SAMPLE_RATE = float(os.getenv("LOG_VERBOSE_SAMPLE_RATE", "0.01"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+_stats = {"dropped": 0}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def bind_request_id(request_id: str | None = None) -> contextvars.Token:
+    """Sets the request id for everything logged from this task (and tasks it starts)."""
+    return request_id_var.set(request_id or new_request_id())
+
+
+def verbose_sampled(request_id: str, rate: float = LOG_VERBOSE_SAMPLE_RATE) -> bool:
+    """Same decision for every record of a request, so sampled requests are complete."""
+    return rate >= 1 or (rate > 0 and zlib.crc32(request_id.encode()) % 10_000 < rate * 10_000)
+
+
+def cap(value, limit: int = LOG_FIELD_MAX_CHARS):
+    """Truncates long values to `limit` chars, noting how much was cut."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}…(+{len(text) - limit} chars)"
+
+
+class CappedQueueHandler(logging.handlers.QueueHandler):
+    """Caps and samples on the caller's side, formats on the listener thread.
+
+    Never blocks: when the queue is full the record is dropped and counted.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        request_id = request_id_var.get()
+        fields = {key: cap(value) for key, value in (getattr(record, "fields", None) or {}).items()}
+        verbose = getattr(record, "verbose", None)
+        if verbose and verbose_sampled(request_id):
+            fields.update({key: cap(value) for key, value in verbose.items()})
+        if record.exc_info:
+            fields["exception"] = cap(logging.Formatter().formatException(record.exc_info), LOG_TRACEBACK_MAX_CHARS)
+
+        prepared = logging.makeLogRecord({
+            "name": record.name,
+            "levelno": record.levelno,
+            "levelname": record.levelname,
+            "created": record.created,
+            "process": record.process,
+            "msg": cap(record.getMessage(), LOG_MESSAGE_MAX_CHARS),
+            "args": None,
+        })
+        prepared.request_id = request_id
+        prepared.fields = fields
+        return prepared
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps({
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.created % 1 * 1000):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value!r}" for key, value in getattr(record, "fields", {}).items())
+        return (
+            f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} "
+            f"{record.name} [{getattr(record, 'request_id', '-')}] {record.getMessage()}"
+            + (f" {fields}" if fields else "")
+        )
+
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: CappedQueueHandler | None = None
+
+
+def _start_listener() -> None:
+    global _listener
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, handler, respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener() -> None:
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def _restart_in_child() -> None:
+    # The listener thread does not survive a fork (serve.py), and the parent's
+    # queue may have been locked mid-put: each worker gets a fresh queue and thread
+    _queue_handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _start_listener()
+
+
+def setup_logging(level: str = LOG_LEVEL) -> None:
+    """Routes the root logger (and uvicorn's) through the capped queue. Idempotent."""
+    global _queue_handler
+    if _queue_handler is not None:
+        return
+    _queue_handler = CappedQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers.clear()
+        logging.getLogger(name).propagate = True
+    _start_listener()
+    atexit.register(_stop_listener)
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def logging_stats() -> dict:
+    return {
+        "queued": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _stats["dropped"],
+    }
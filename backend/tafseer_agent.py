@@ -22,6 +22,7 @@ from pydantic import BaseModel
 
 
 import pandas as pd
+from model_profiles import apply_profiles
 load_dotenv()
 import os
 
@@ -116,6 +117,8 @@ output_guardrail_agent = Agent(
     
     )
 
+apply_profiles(input_guardrails_agent, output_guardrail_agent)
+
 
 # ------------------------------------------------------------------
 # ---------------------- Input guardrail ---------------------------
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The app reads its CSVs relative to backend/ and imports its modules flat
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(BACKEND_DIR)
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("FIREWORKS_API_KEY", "test")
+os.environ.setdefault("DAILY_REFLECTION_ENABLED", "0")
@@ -0,0 +1,17 @@
+import os
+
+import asbab_pipeline
+
+
+def test_build_keeps_other_workers_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(asbab_pipeline, "CACHE_DIR", str(tmp_path))
+    stale = tmp_path / "asbab-0123abcd.jsonl.gz"
+    in_progress = tmp_path / "asbab-4567ef.jsonl.gz.4242.tmp"
+    stale.write_bytes(b"")
+    in_progress.write_bytes(b"")
+
+    artifact = asbab_pipeline.build()
+
+    assert os.path.exists(artifact)
+    assert not stale.exists()
+    assert in_progress.exists()
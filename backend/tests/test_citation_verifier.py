@@ -0,0 +1,27 @@
+import pytest
+
+from citation_verifier import INCONCLUSIVE, INVALID, VALID, verify_citations
+
+
+@pytest.mark.parametrize("reply, status", [
+    # Standard spelling of an Uthmani verse
+    ("ذلك الكتاب لا ريب فيه (2:2)", VALID),
+    ("Ayat al-Kursi is 2:255.", VALID),
+    # A quote that is a different verse than the one cited
+    ("ذَٰلِكَ ٱلْكِتَٰبُ لَا رَيْبَ (2:5)", INVALID),
+    # Urdu prose next to a reference is not a quote
+    ("آیت الکرسی اللہ تعالیٰ کی عظمت بیان کرتی ہے اور یہ بہت اہم ہے (2:255)", VALID),
+    # Clock times are not references
+    ("Fajr is at 5:00 and Maghrib at 6:30 pm", INCONCLUSIVE),
+    # Quotes spanning the ayahs of a cited range
+    ("بسم الله الرحمن الرحيم الحمد لله رب العالمين (1:1-2)", VALID),
+    # Fabricated references and Arabic that isn't the cited verse
+    ("See 2:300 for the ruling on this.", INVALID),
+    ("As Allah says in Surah 115:3, be patient.", INVALID),
+    ("قال رسول الله صلى الله عليه وسلم إنما الأعمال بالنيات (2:255)", INVALID),
+    # Number pairs and Arabic that may not be citations go to the LLM verifier
+    ("The recipe uses flour and water at 3:500.", INCONCLUSIVE),
+    ("قال رسول الله صلى الله عليه وسلم إنما الأعمال بالنيات", INCONCLUSIVE),
+])
+def test_verdicts(reply, status):
+    assert verify_citations(reply).status == status
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+from agents import GuardrailFunctionOutput, InputGuardrailTripwireTriggered
+from agents.guardrail import InputGuardrail, InputGuardrailResult
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import daily_content
+
+
+def test_daily_honors_if_none_match_list():
+    client = TestClient(FastAPI(routes=daily_content.router.routes))
+    etag = client.get("/api/daily").headers["etag"]
+    assert client.get("/api/daily", headers={"If-None-Match": f'"stale", {etag}'}).status_code == 304
+    assert client.get("/api/daily", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_guardrail_rejection_is_logged_with_its_reason(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(daily_content, "DAILY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(daily_content, "DAILY_REFLECTION_ENABLED", True)
+
+    async def rejected(content):
+        guardrail = InputGuardrail(lambda ctx, agent, input: None, name="quran_input_guardrail")
+        output = GuardrailFunctionOutput(output_info="Off-topic request", tripwire_triggered=True)
+        raise InputGuardrailTripwireTriggered(InputGuardrailResult(guardrail, output))
+
+    monkeypatch.setattr(daily_content, "generate_reflection", rejected)
+    job = daily_content.DailyJob()
+    with caplog.at_level(logging.WARNING, logger="daily_content"):
+        asyncio.run(job.refresh())
+
+    record = next(r for r in caplog.records if "rejected by a guardrail" in r.getMessage())
+    assert record.fields["guardrail"] == "quran_input_guardrail"
+    assert record.fields["reason"] == "Off-topic request"
+    assert job.content.attempts == 1 and job.content.reflection is None
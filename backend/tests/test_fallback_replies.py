@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import speculative
+import fallback_replies
+from fallback_replies import GREETING_BODY, EN, OFF_TOPIC, QURAN_SCOPE, TEMPLATES, fallback_reply, fallback_stats, mentions_off_topic, obviously_off_topic
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Guardrails first, so a tripwire never starts the agent's model call
+    monkeypatch.setitem(speculative.GUARDRAIL_MODES, "QuranTadabburAgent", speculative.SEQUENTIAL)
+    return TestClient(main.app)
+
+
+def chat(client, text: str) -> str:
+    response = client.post("/api/chat", json={"messages": [{"role": "user", "content": text}]})
+    assert response.status_code == 200
+    return response.json()["reply"]
+
+
+def test_greeting_gets_template(client):
+    before = fallback_stats().get("greeting: local", 0)
+    assert chat(client, "hi") == f"Hi there! {GREETING_BODY[EN]}"
+    assert fallback_stats()["greeting: local"] == before + 1
+
+
+def test_salam_gets_salam_reply(client):
+    assert chat(client, "Assalamu alaikum") == f"Wa alaikum assalam! {GREETING_BODY[EN]}"
+
+
+@pytest.mark.parametrize("text", [
+    "Explain 2:255-257",
+    "What do verses 2:1-5 teach?",
+    "Tell me about 2:30-39",
+    "Summarize 2:1-20 for me",
+])
+def test_verse_ranges_are_not_off_topic(text):
+    assert not obviously_off_topic(text)
+
+
+def test_arithmetic_is_off_topic():
+    assert obviously_off_topic("what is 2+2")
+
+
+def test_story_keyword_does_not_hide_off_topic_request():
+    assert obviously_off_topic("write me python code for a story generator")
+    assert not obviously_off_topic("tell me the story of musa like a movie")
+
+
+def test_quranic_words_do_not_hide_off_topic_content_in_a_reply():
+    # Left to the output guardrail's LLM verdict even though the citation is real
+    reply = "Here is python code: print(1). As Allah says in 1:1."
+    assert mentions_off_topic(reply) and not obviously_off_topic(reply)
+
+
+def test_empty_model_fallback_gets_the_english_template(monkeypatch):
+    async def reasoning_only(agent, input, context=None):
+        return SimpleNamespace(final_output="")
+
+    monkeypatch.setattr(fallback_replies.Runner, "run", reasoning_only)
+    # Neither English, Arabic nor Urdu, so the model is asked
+    reply = asyncio.run(fallback_reply(OFF_TOPIC, "Quelle est la meilleure voiture ?", QURAN_SCOPE, None, "off topic"))
+    assert reply == TEMPLATES[(OFF_TOPIC, QURAN_SCOPE)][EN]
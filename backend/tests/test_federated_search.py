@@ -0,0 +1,12 @@
+import asyncio
+import os
+
+import federated_search
+from federated_search import QURAN, TAFSIR, federated_search as search
+
+
+def test_tafsir_is_only_offered_when_its_dataset_exists():
+    assert (TAFSIR in federated_search.SOURCES) == os.path.exists(federated_search.TAFSIR_CSV_PATH)
+    results = asyncio.run(search("2:255", sources=(QURAN, TAFSIR)))
+    assert TAFSIR not in results.skipped
+    assert any(c.source == QURAN for c in results.citations)
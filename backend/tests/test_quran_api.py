@@ -0,0 +1,21 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import quran_api
+
+client = TestClient(FastAPI(routes=quran_api.router.routes))
+
+
+def test_if_none_match_lists_and_wildcard():
+    etag = client.get("/api/ayah/1").headers["etag"]
+    assert client.get("/api/ayah/1", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/api/ayah/1", headers={"If-None-Match": "*"}).status_code == 304
+    assert client.get("/api/ayah/1", headers={"If-None-Match": etag[:-3] + '"'}).status_code == 200
+
+
+def test_search_caches_hits_per_normalized_query():
+    quran_api._search_hits.cache_clear()
+    first = client.get("/api/search", params={"q": "Mercy", "page_size": 5}).json()
+    second = client.get("/api/search", params={"q": "  mercy ", "page": 2, "page_size": 5}).json()
+    assert quran_api._search_hits.cache_info().currsize == 1
+    assert first["total"] == second["total"] and first["data"] != second["data"]
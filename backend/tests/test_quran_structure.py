@@ -0,0 +1,30 @@
+from quran_structure import load_structure_index
+
+
+def test_dataset_only_unit_past_the_dataset_is_open():
+    index = load_structure_index()
+    hizb = index.hizb(5)
+    assert hizb.open
+    assert "end is not known" in hizb.describe()
+    assert index.hizb(6) is None
+    assert not index.hizb(4).open
+    assert index.range("juz", 30).reference == "78:1-114:6"
+
+
+def test_surah_as_sajdah_is_not_the_sajdah_list():
+    index = load_structure_index()
+    assert index.resolve("tell me about Surah As-Sajdah") == []
+    assert index.resolve("what is al-sajdah about") == []
+    assert len(index.resolve("list the sajdah verses")) == 15
+
+
+def test_ruku_of_a_named_surah_counts_within_it():
+    index = load_structure_index()
+    (found,) = index.resolve("ruku 5 of surah baqarah")
+    assert found.reference == "2:40-46"
+    assert found.label == "Ruku 5 of surah 2 (ruku 6 overall)"
+    assert index.resolve("ruku 5 of Al-Baqara")[0].reference == "2:40-46"
+    assert not index.resolve("ruku 40 of surah 2")[0].open
+    assert index.resolve("ruku 41 of surah baqarah") == []
+    assert index.resolve("ruku 3 of surah al-imran") == []  # not in the dataset: nothing rather than a guess
+    assert index.resolve("ruku 5")[0].reference == "2:30-39"
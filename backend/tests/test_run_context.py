@@ -0,0 +1,16 @@
+from run_context import TadabburContext, guardrail_stats
+
+
+def test_compatible_passing_verdict_is_reused_once_recorded():
+    ctx = TadabburContext(query="What does 2:255 teach?")
+    before = guardrail_stats()
+    assert not ctx.reuse_verdict("semantic_guardrail", "user: What does 2:255 teach?")
+    ctx.record_verdict("quran_input_guardrail", "user:  What does 2:255 teach?", passed=True)
+    assert ctx.reuse_verdict("semantic_guardrail", "user: What does 2:255 teach?")
+    # Input verdicts never stand in for output checks, and failures are not kept
+    assert not ctx.reuse_verdict("quran_output_guardrail", "user: What does 2:255 teach?")
+    ctx.record_verdict("quran_output_guardrail", "reply", passed=False)
+    assert not ctx.reuse_verdict("story_output_guardrail", "reply")
+    assert (ctx.guardrail_checks, ctx.guardrail_checks_reused) == (2, 1)
+    after = guardrail_stats()
+    assert (after["checks"] - before["checks"], after["reused"] - before["reused"]) == (2, 1)
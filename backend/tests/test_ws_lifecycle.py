@@ -0,0 +1,34 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ws_lifecycle import ConnectionClosed, ConnectionRegistry
+
+
+def _socket(host: str):
+    return SimpleNamespace(client=SimpleNamespace(host=host))
+
+
+def test_per_ip_cap_is_off_by_default():
+    registry = ConnectionRegistry()
+    for i in range(50):
+        registry.open(str(i), _socket("10.0.0.1"))  # e.g. every client behind one load balancer
+    assert len(registry.connections) == 50
+
+
+def test_per_ip_cap_when_enabled():
+    registry = ConnectionRegistry(max_per_ip=2)
+    registry.open("a", _socket("203.0.113.7"))
+    registry.open("b", _socket("203.0.113.7"))
+    with pytest.raises(ConnectionClosed):
+        registry.open("c", _socket("203.0.113.7"))
+    registry.open("d", _socket("198.51.100.4"))
+
+
+def test_turn_message_bytes_is_the_utf8_size_of_the_message():
+    registry = ConnectionRegistry()
+    conn = registry.open("a", _socket("10.0.0.1"))
+    conn.begin_turn('{"content": "بسم"}')
+    assert registry.gauges()["turn_message_bytes"] == len('{"content": "بسم"}'.encode("utf-8"))
+    conn.end_turn()
+    assert registry.gauges()["turn_message_bytes"] == 0
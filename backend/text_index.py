@@ -0,0 +1,91 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+# Small lexical search helpers shared by the local indexes (story exemplars,
+# Quran data, duas, ...). Pure Python so they load instantly with the app.
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Arabic diacritics (tashkeel), Quranic annotation marks and tatweel
+_ARABIC_MARKS_RE = re.compile(r"[\u0610-\u061A\u064B-\u065F\u06D6-\u06ED\u0640]")
+_ARABIC_LETTER_MAP = str.maketrans({
+    "\u0670": "\u0627",  # superscript (dagger) alef -> alef: الكتٰب -> الكتاب
+    "\u0622": "\u0627",  # alef madda -> alef
+    "\u0623": "\u0627",  # alef hamza above -> alef
+    "\u0625": "\u0627",  # alef hamza below -> alef
+    "\u0671": "\u0627",  # alef wasla -> alef
+    "\u0649": "\u064A",  # alef maksura -> yeh
+    "\u0629": "\u0647",  # teh marbuta -> heh
+})
+
+STOPWORDS = frozenset("""
+a an and are as at be by can did do does for from give had has have he her his how i in is it
+its me my of on or our please she show so tell that the their them then there these they this
+to us was we what when where which who why will with would you your about
+""".split())
+
+
+def normalize_arabic(text: str) -> str:
+    """Strips tashkeel/Quranic marks and unifies common letter variants."""
+    return _ARABIC_MARKS_RE.sub("", text).translate(_ARABIC_LETTER_MAP)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens with stopwords removed (Arabic is normalized first)."""
+    text = normalize_arabic(str(text)).lower()
+    return [t for t in _TOKEN_RE.findall(text) if t not in STOPWORDS and not t.isdigit()]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap model-token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, documents: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: list[int] = []
+
+        for doc_id, doc in enumerate(documents):
+            counts = Counter(tokenize(doc))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((doc_id, tf))
+
+        self.avg_length = (sum(self.doc_lengths) / self.size) if self.size else 0.0
+        self.idf = {
+            term: math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def scores(self, query: str) -> dict[int, float]:
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def reference_score(self, query: str) -> float:
+        """Score of an average-length document containing every query term once.
+
+        Query terms this index has never seen count at the highest idf, so the
+        ratio score / reference_score says how much of the query a document
+        covers and is comparable across indexes.
+        """
+        unseen_idf = math.log(1 + (self.size + 0.5) / 0.5)
+        return sum(self.idf.get(term, unseen_idf) for term in set(tokenize(query)))
+
+    def search(self, query: str, k: int = 5) -> list[tuple[int, float]]:
+        """Returns up to `k` (doc_id, score) pairs, best first."""
+        ranked = sorted(self.scores(query).items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
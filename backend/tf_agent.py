@@ -19,6 +19,7 @@ from pydantic import BaseModel
 
 
 import pandas as pd
+from federated_search import search_sources
 load_dotenv()
 import os
 
@@ -124,14 +125,16 @@ Tafsir_Agent: Agent = Agent(
     name= "QuranicTafsirAgent",
     instructions= f"""You are a Quranic Tafsir agent that provides explanations of Quranic verses
     based only on the following context:\n\n{csv_content}\n\nRestriction: Use ONLY the provided c
-    ontext. Do NOT use external knowledge, web resources, or hallucinate.
-    
+    ontext and what the `search_sources` tool returns from the local tafsir, Quran and Asbab al-Nuzul
+    datasets; use the tool when the context above doesn't cover the verse. Do NOT use external
+    knowledge, web resources, or hallucinate.
     """,
 
     model_settings= ModelSettings(
         temperature= 0.7,
         
     ),
+    tools=[search_sources],
     # input_guardrails=[input_guardrail_agent_fn],
     # output_guardrails= [output_agent_guard_fn],
     
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from fastapi import WebSocket
+
+# Lifecycle limits for /ws/chat: connection caps (total and per client IP),
+# heartbeats while a socket is quiet, idle eviction, a maximum message size and
+# per-connection accounting, so one instance can hold thousands of mostly-idle
+# chat tabs without leaking sockets or memory.
+
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", "10000"))
+# Off (0) by default: behind a load balancer every socket comes from the
+# balancer's address unless uvicorn trusts its X-Forwarded-For, so set
+# FORWARDED_ALLOW_IPS to the proxies' addresses before turning the cap on.
+WS_MAX_CONNECTIONS_PER_IP = int(os.getenv("WS_MAX_CONNECTIONS_PER_IP", "0"))
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+WS_IDLE_TIMEOUT_S = float(os.getenv("WS_IDLE_TIMEOUT_S", "600"))
+# An application-level {"type": "heartbeat"} after this much silence keeps
+# proxies from cutting the socket; protocol pings (uvicorn ws_ping_*) catch
+# half-open connections.
+WS_HEARTBEAT_INTERVAL_S = float(os.getenv("WS_HEARTBEAT_INTERVAL_S", "25"))
+WS_PING_TIMEOUT_S = float(os.getenv("WS_PING_TIMEOUT_S", "20"))
+WS_MAX_MESSAGE_BYTES = int(os.getenv("WS_MAX_MESSAGE_BYTES", str(256 * 1024)))
+
+# Close codes (RFC 6455 / IANA registry)
+CLOSE_GOING_AWAY = 1001
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_MESSAGE_TOO_BIG = 1009
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+def uvicorn_ws_options() -> dict:
+    """uvicorn.Config / uvicorn.run settings matching these limits."""
+    return {
+        "ws_ping_interval": WS_HEARTBEAT_INTERVAL_S,
+        "ws_ping_timeout": WS_PING_TIMEOUT_S,
+        # Frame limit with headroom; oversized messages get a proper close below
+        "ws_max_size": 2 * WS_MAX_MESSAGE_BYTES,
+        # websocket.client is the X-Forwarded-For address when a trusted proxy sent it
+        "proxy_headers": True,
+        "forwarded_allow_ips": FORWARDED_ALLOW_IPS,
+    }
+
+
+class ConnectionClosed(Exception):
+    """The server is closing the connection; `code` and `reason` go in the close frame."""
+
+    def __init__(self, code: int, reason: str):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+def _utf8_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+@dataclass(eq=False)
+class Connection:
+    id: str
+    ip: str
+    opened_at: float = field(default_factory=time.monotonic)
+    last_activity: float = field(default_factory=time.monotonic)
+    busy: bool = False
+    turns: int = 0
+    bytes_in: int = 0
+    turn_message_bytes: int = 0  # UTF-8 size of the message whose turn is running (not a memory figure)
+
+    def begin_turn(self, raw: str) -> None:
+        self.busy = True
+        self.turns += 1
+        self.last_activity = time.monotonic()
+        self.turn_message_bytes = _utf8_len(raw)
+
+    def end_turn(self) -> None:
+        self.busy = False
+        self.turn_message_bytes = 0
+        self.last_activity = time.monotonic()
+
+
+class ConnectionRegistry:
+    def __init__(self, max_connections: int = WS_MAX_CONNECTIONS, max_per_ip: int = WS_MAX_CONNECTIONS_PER_IP):
+        self.max_connections = max_connections
+        self.max_per_ip = max_per_ip
+        self.connections: dict[str, Connection] = {}
+        self.per_ip: Counter[str] = Counter()
+        self.counters: Counter[str] = Counter()
+
+    def open(self, connection_id: str, websocket: WebSocket) -> Connection:
+        """Registers a new connection; raises `ConnectionClosed` when a cap is reached."""
+        ip = websocket.client.host if websocket.client else "unknown"
+        if len(self.connections) >= self.max_connections:
+            self.counters["rejected_total_cap"] += 1
+            raise ConnectionClosed(CLOSE_TRY_AGAIN_LATER, "server is at its connection limit")
+        if self.max_per_ip and self.per_ip[ip] >= self.max_per_ip:
+            self.counters["rejected_ip_cap"] += 1
+            raise ConnectionClosed(CLOSE_POLICY_VIOLATION, "too many connections from this address")
+        conn = Connection(connection_id, ip)
+        self.connections[connection_id] = conn
+        self.per_ip[ip] += 1
+        self.counters["opened"] += 1
+        return conn
+
+    def close(self, conn: Connection, reason: str = "closed") -> None:
+        if self.connections.pop(conn.id, None) is None:
+            return
+        self.per_ip[conn.ip] -= 1
+        if self.per_ip[conn.ip] <= 0:
+            del self.per_ip[conn.ip]
+        self.counters[f"closed: {reason}"] += 1
+
+    async def receive(self, websocket: WebSocket, conn: Connection) -> str:
+        """Next text message, sending heartbeats while waiting.
+
+        Raises `ConnectionClosed` on idle timeout or an oversized message, and
+        `WebSocketDisconnect` when the client goes away.
+        """
+        conn.end_turn()
+        while True:
+            idle_left = conn.last_activity + WS_IDLE_TIMEOUT_S - time.monotonic()
+            if idle_left <= 0:
+                raise ConnectionClosed(CLOSE_GOING_AWAY, "idle timeout")
+            try:
+                async with asyncio.timeout(min(WS_HEARTBEAT_INTERVAL_S, idle_left)):
+                    raw = await websocket.receive_text()
+            except TimeoutError:
+                if time.monotonic() - conn.last_activity < WS_IDLE_TIMEOUT_S:
+                    await websocket.send_json({"type": "heartbeat"})
+                continue
+            size = _utf8_len(raw)
+            conn.bytes_in += size
+            if size > WS_MAX_MESSAGE_BYTES:
+                raise ConnectionClosed(CLOSE_MESSAGE_TOO_BIG, f"message larger than {WS_MAX_MESSAGE_BYTES} bytes")
+            return raw
+
+    def gauges(self) -> dict:
+        now = time.monotonic()
+        busy = sum(1 for c in self.connections.values() if c.busy)
+        idle_for = [now - c.last_activity for c in self.connections.values() if not c.busy]
+        return {
+            "open": len(self.connections),
+            "busy": busy,
+            "idle": len(self.connections) - busy,
+            "idle_over_60s": sum(1 for s in idle_for if s > 60),
+            "client_ips": len(self.per_ip),
+            "max_per_ip_in_use": max(self.per_ip.values(), default=0),
+            "turn_message_bytes": sum(c.turn_message_bytes for c in self.connections.values()),
+            "bytes_in": sum(c.bytes_in for c in self.connections.values()),
+            "limits": {
+                "max_connections": self.max_connections,
+                "max_per_ip": self.max_per_ip,
+                "idle_timeout_s": WS_IDLE_TIMEOUT_S,
+                "heartbeat_interval_s": WS_HEARTBEAT_INTERVAL_S,
+                "max_message_bytes": WS_MAX_MESSAGE_BYTES,
+            },
+            "counters": dict(self.counters),
+        }
+
+
+registry = ConnectionRegistry()